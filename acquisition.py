@@ -0,0 +1,235 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+NSEQ_MODULO = 16  # nSeq is a 4-bit frame counter
+
+
+def analog_columns(samples):
+    """Default transform: keep the analog columns of a device.read() result."""
+    return samples[:, 5:]
+
+
+class SequenceTracker:
+    """
+    Detects lost frames from the nSeq column of device.read() results.
+
+    nSeq counts frames modulo 16, so a burst of 16 or more lost frames in a
+    row aliases to a smaller gap; everything below that is counted exactly.
+    """
+
+    def __init__(self):
+        self.last_seq = None
+        self.frames = 0
+        self.dropped = 0
+        self.gap_events = 0
+        self.largest_gap = 0
+
+    def update(self, nseq):
+        """Account for one chunk; returns the number of frames lost before each frame."""
+        nseq = np.asarray(nseq, dtype=np.int64)
+        if len(nseq) == 0:
+            return np.zeros(0, dtype=np.int64)
+        prev = nseq[0] - 1 if self.last_seq is None else self.last_seq
+        gaps = (np.diff(nseq, prepend=prev) - 1) % NSEQ_MODULO
+        self.last_seq = int(nseq[-1])
+        self.frames += len(nseq)
+        lost = int(gaps.sum())
+        if lost:
+            self.dropped += lost
+            self.gap_events += int(np.count_nonzero(gaps))
+            self.largest_gap = max(self.largest_gap, int(gaps.max()))
+        return gaps
+
+    @property
+    def drop_rate(self) -> float:
+        total = self.frames + self.dropped
+        return self.dropped / total if total else 0.0
+
+    def reset(self):
+        self.__init__()
+
+
+def fill_gaps(chunk, gaps, last=None, mode="interp"):
+    """
+    Insert the frames reported missing by SequenceTracker.update() into chunk.
+
+    mode: "nan" marks them with NaN, "hold" repeats the previous value and
+    "interp" interpolates linearly between the neighbours. `last` is the
+    value of the frame before the chunk (needed for hold/interp across chunk
+    boundaries). Keeps the sample counter of a RingBuffer aligned with time.
+    """
+    if not np.any(gaps):
+        return chunk
+    one_dim = np.ndim(chunk) == 1
+    values = np.asarray(chunk, dtype=float).reshape(len(chunk), -1)
+
+    pos = np.arange(len(values)) + np.cumsum(gaps)
+    out = np.full((pos[-1] + 1, values.shape[1]), np.nan)
+    out[pos] = values
+    if mode != "nan":
+        if last is None:
+            known_pos, known = pos, values
+        else:
+            known_pos = np.concatenate([[-1], pos])
+            known = np.vstack([np.asarray(last, dtype=float).reshape(1, -1), values])
+        missing = np.setdiff1d(np.arange(len(out)), pos)
+        if mode == "hold":
+            out[missing] = known[np.maximum(np.searchsorted(known_pos, missing) - 1, 0)]
+        elif mode == "interp":
+            for c in range(out.shape[1]):
+                out[missing, c] = np.interp(missing, known_pos, known[:, c])
+        else:
+            raise ValueError(f"Unknown gap fill mode {mode!r}")
+    return out[:, 0] if one_dim else out
+
+
+class AcquisitionThread(threading.Thread):
+    """
+    Reads the device in the background and appends every chunk to a RingBuffer.
+
+    The thread is the only writer and the GUI only reads, so no lock is
+    needed: RingBuffer publishes its sample counter after the data is in
+    place. Give the buffer some headroom over what the GUI displays (e.g. one
+    extra second) so the oldest plotted samples are not overwritten while a
+    frame is being drawn.
+
+    The time between the end of one read() and the start of the next is the
+    window in which the device buffer can overflow; it is tracked as
+    `max_gap` (seconds) and summarised by stats(). When `fs` is given, reads
+    that were started more than one chunk duration late count as overruns.
+
+    `clock` keeps (host time, buffer.total) after each read, which
+    multi_device.py uses to estimate the device clock against the host.
+
+    Lost frames are detected from nSeq by `integrity` (a SequenceTracker).
+    With fill="nan"/"hold"/"interp" the missing frames are inserted into the
+    buffer so its sample counter stays aligned with time.
+
+    If a `recorder` (recorder.StreamRecorder) is given, every raw chunk is
+    handed to it before the transform; it queues and never blocks the loop.
+    """
+
+    def __init__(
+        self,
+        device,
+        n_samples,
+        buffer,
+        transform=analog_columns,
+        fs=None,
+        fill=None,
+        recorder=None,
+        name="acquisition",
+    ):
+        super().__init__(name=name, daemon=True)
+        self.device = device
+        self.n_samples = n_samples
+        self.buffer = buffer
+        self.transform = transform
+        self.fill = fill
+        self.recorder = recorder
+        self.overrun_gap = n_samples / fs if fs else None
+        self.integrity = SequenceTracker()
+        self._running = False
+        self._last_value = None
+
+        self.reads = 0
+        self.errors = 0
+        self.overruns = 0
+        self.max_gap = 0.0
+        self.gaps = deque(maxlen=1000)
+        self.read_times = deque(maxlen=1000)
+        self.clock = deque(maxlen=2000)
+        self.last_read_time = None
+
+    def run(self):
+        self._running = True
+        last_return = None
+        while self._running:
+            t_call = time.perf_counter()
+            try:
+                samples = self.device.read(self.n_samples)
+            except EOFError:
+                print("Acquisition finished: end of replay.")
+                break
+            except Exception as e:
+                self.errors += 1
+                print("⚠️ Read error:", e)
+                time.sleep(0.05)
+                last_return = None
+                continue
+            t_return = time.perf_counter()
+
+            if last_return is not None:
+                gap = t_call - last_return
+                self.gaps.append(gap)
+                self.max_gap = max(self.max_gap, gap)
+                if self.overrun_gap is not None and gap > self.overrun_gap:
+                    self.overruns += 1
+            self.read_times.append(t_return - t_call)
+            last_return = t_return
+            self.last_read_time = t_return
+
+            if self.recorder is not None:
+                self.recorder.write(samples)
+            gaps = self.integrity.update(samples[:, 0])
+            chunk = self.transform(samples)
+            if self.fill is not None and len(chunk):
+                chunk = fill_gaps(chunk, gaps, self._last_value, self.fill)
+                self._last_value = chunk[-1]
+            self.buffer.extend(chunk)
+            self.clock.append((t_return, self.buffer.total))
+            self.reads += 1
+        self._running = False
+
+    def read_time(self, end):
+        """
+        perf_counter() time at which the read that brought buffer.total to
+        `end` returned (None if it is no longer in `clock`).
+        """
+        stamp = None
+        for t_return, total in reversed(list(self.clock)):
+            if total < end:
+                break
+            stamp = t_return
+        return stamp
+
+    def stop(self, timeout=1.0):
+        self._running = False
+        if self.is_alive():
+            self.join(timeout)
+
+    def stats(self):
+        """Read-gap (milliseconds) and lost-frame summary."""
+        gaps = np.array(self.gaps) if self.gaps else np.zeros(1)
+        reads = np.array(self.read_times) if self.read_times else np.zeros(1)
+        return {
+            "reads": self.reads,
+            "errors": self.errors,
+            "overruns": self.overruns,
+            "dropped": self.integrity.dropped,
+            "gap_events": self.integrity.gap_events,
+            "drop_rate": self.integrity.drop_rate,
+            "gap_mean_ms": 1000 * float(np.mean(gaps)),
+            "gap_p99_ms": 1000 * float(np.percentile(gaps, 99)),
+            "gap_max_ms": 1000 * self.max_gap,
+            "read_mean_ms": 1000 * float(np.mean(reads)),
+        }
+
+    def stats_text(self):
+        s = self.stats()
+        return (
+            f"reads {s['reads']} | gap mean {s['gap_mean_ms']:.2f} ms, "
+            f"p99 {s['gap_p99_ms']:.2f} ms, max {s['gap_max_ms']:.2f} ms | "
+            + self.status_text()
+        )
+
+    def status_text(self):
+        """Short live counter line for window titles and HUDs."""
+        return (
+            f"dropped {self.integrity.dropped} ({self.integrity.gap_events} gaps) | "
+            f"overruns {self.overruns}"
+        )
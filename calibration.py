@@ -0,0 +1,217 @@
+"""
+Per-user calibration of the gesture MLP at session start.
+
+The user holds each gesture for a few seconds while the live classifier
+keeps running; the raw features of those windows update the scaler
+statistics (StandardScaler.partial_fit on top of the bundle's mean and
+variance) and fine-tune the bundle's MLP (a warm-started fit from its
+weights) in a background thread. The result is saved as a per-user bundle in PROFILE_DIR, which
+life_classification_2.py loads instead of the generic model next time:
+
+    calibration = Calibration(bundle, profile_path("hayato"))
+    for p in worker.results():
+        calibration.add(p)  # Prediction with raw features
+    label.setText(calibration.prompt())
+    if calibration.finished:
+        worker.reload(calibration.profile)
+
+    python calibration.py hayato min_data/hayato_*.h5  # from recordings, with held-out accuracy
+"""
+
+import os
+import threading
+import time
+import warnings
+
+import numpy as np
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.neural_network import MLPClassifier
+from sklearn.preprocessing import StandardScaler
+
+from model_bundle import save_bundle
+
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+
+
+def profile_path(user):
+    return os.path.join(PROFILE_DIR, f"{user}.bundle")
+
+
+def _sklearn_mlp(model, learning_rate, epochs):
+    """MLPClassifier with the weights of a CompiledMLP; fit() continues from them."""
+    hidden = tuple(W.shape[1] for W in model.weights[:-1])
+    mlp = MLPClassifier(
+        hidden_layer_sizes=hidden,
+        activation=model.activation,
+        solver="adam",
+        learning_rate_init=learning_rate,
+        max_iter=epochs,
+        warm_start=True,
+        random_state=1,
+    )
+    # One partial_fit sets up the classes and layer shapes, then the weights
+    # are replaced; with warm_start, fit() keeps them and starts a new optimizer
+    classes = model.classes
+    mlp.partial_fit(np.zeros((len(classes), model.n_features)), classes, classes=classes)
+    mlp.coefs_ = [np.array(W, dtype=float) for W in model.weights]
+    mlp.intercepts_ = [np.array(b, dtype=float) for b in model.biases]
+    return mlp
+
+
+def fine_tune(bundle, X, y, epochs=30, prior_windows=None, learning_rate=1e-3):
+    """
+    (mlp, scaler) adapted to the raw feature vectors X with classes y.
+
+    prior_windows: how many windows the bundle's scaler statistics count
+    for against X (default: as many as X, i.e. an even blend).
+    """
+    if bundle.kind != "mlp":
+        raise ValueError(f"Calibration needs an MLP bundle, {bundle.path} is {bundle.kind}")
+    model = bundle.model
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y)
+
+    scaler = StandardScaler()
+    scaler.mean_ = np.array(model.mean, dtype=float)
+    scaler.var_ = np.array(model.scale, dtype=float) ** 2
+    scaler.scale_ = np.array(model.scale, dtype=float)
+    scaler.n_samples_seen_ = np.int64(len(X) if prior_windows is None else prior_windows)
+    scaler.n_features_in_ = model.n_features
+    scaler.partial_fit(X)
+
+    mlp = _sklearn_mlp(model, learning_rate, epochs)
+    with warnings.catch_warnings():
+        # `epochs` is a budget, not a convergence target
+        warnings.simplefilter("ignore", ConvergenceWarning)
+        mlp.fit(scaler.transform(X), y)
+    return mlp, scaler
+
+
+class Calibration:
+    """
+    Guided recording of every gesture, then fine_tune() in a background thread.
+
+    Each gesture gets `settle_secs` to get into position and `collect_secs`
+    of windows; add() is fed the worker's Predictions and keeps the raw
+    features of the windows that fall into a collection phase.
+    """
+
+    def __init__(
+        self,
+        bundle,
+        profile,
+        collect_secs=4.0,
+        settle_secs=1.5,
+        epochs=30,
+        prior_windows=None,
+    ):
+        self.bundle = bundle
+        self.profile = profile
+        self.collect_secs = collect_secs
+        self.settle_secs = settle_secs
+        self.epochs = epochs
+        self.prior_windows = prior_windows
+        self.classes = [int(c) for c in bundle.model.classes]
+        self.X, self.y = [], []
+        self.started = time.time()
+        self.thread = None
+        self.finished = False
+        self.error = None
+
+    @property
+    def phase(self):
+        """(gesture index, collecting) at the current time; index == len(classes) when done."""
+        elapsed = time.time() - self.started
+        per_gesture = self.settle_secs + self.collect_secs
+        i = int(elapsed // per_gesture)
+        return min(i, len(self.classes)), elapsed - i * per_gesture >= self.settle_secs
+
+    def gesture(self, i):
+        return self.bundle.class_names[self.classes[i]]
+
+    def add(self, prediction):
+        i, collecting = self.phase
+        if i < len(self.classes) and collecting:
+            self.X.append(prediction.raw)
+            self.y.append(self.classes[i])
+        elif i == len(self.classes) and self.thread is None:
+            self.thread = threading.Thread(target=self._train, name="calibration", daemon=True)
+            self.thread.start()
+
+    def prompt(self):
+        """Instruction / status line for the GUI."""
+        if self.error:
+            return f"Calibration failed: {self.error}"
+        if self.finished:
+            return f"Calibrated ({len(self.X)} windows)"
+        i, collecting = self.phase
+        if i < len(self.classes):
+            return f"{'Hold' if collecting else 'Get ready'}: {self.gesture(i)} ({i + 1}/{len(self.classes)})"
+        return "Calibrating ..."
+
+    def _train(self):
+        try:
+            t0 = time.time()
+            if len(set(self.y)) < len(self.classes):
+                raise ValueError("no windows recorded for some gestures")
+            mlp, scaler = fine_tune(
+                self.bundle, self.X, self.y, self.epochs, self.prior_windows
+            )
+            save_bundle(
+                self.profile,
+                mlp,
+                self.bundle.extractor(),
+                self.bundle.class_names,
+                window=self.bundle.window,
+                step=self.bundle.step,
+                scaler=scaler,
+            )
+            print(f"✅ Calibrated on {len(self.X)} windows in {time.time() - t0:.1f} s")
+            self.finished = True
+        except Exception as e:
+            print("⚠️ Calibration failed:", e)
+            self.error = str(e)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from dataset_store import parse_name
+    from evaluate_stream import CHANNEL_MAP, CHUNK
+    from model_bundle import load_bundle
+    from parallel_features import FeatureJob, extract_recordings
+
+    parser = argparse.ArgumentParser(description="Calibrate the gesture MLP for one user")
+    parser.add_argument("user")
+    parser.add_argument("recordings", nargs="+", help="one recording per gesture (<name>_<gesture>.h5)")
+    parser.add_argument("--bundle", default="model_2/emg_mlp.bundle")
+    parser.add_argument("--secs", type=float, default=4.0, help="seconds used per recording")
+    parser.add_argument("--skip", type=float, default=2.0, help="seconds skipped at the start")
+    args = parser.parse_args()
+
+    bundle = load_bundle(args.bundle)
+    extractor = bundle.extractor()
+    # One window per live chunk, as the worker delivers them during calibration
+    per_sec = bundle.fs / CHUNK
+    first, last = int(args.skip * per_sec), int((args.skip + args.secs) * per_sec)
+    jobs = [FeatureJob(p, CHANNEL_MAP, extractor, bundle.window, CHUNK) for p in args.recordings]
+    X, y, X_test, y_test = [], [], [], []
+    for path, feats in zip(args.recordings, extract_recordings(jobs, verbose=False)):
+        label = bundle.class_names.index(parse_name(path)[0])
+        X.extend(feats[first:last])
+        y.extend([label] * len(feats[first:last]))
+        # Windows after the calibration part (no overlap) are held out
+        held_out = feats[last + bundle.window // CHUNK :]
+        X_test.extend(held_out)
+        y_test.extend([label] * len(held_out))
+    print(f"Calibrating on {len(X)} windows, {len(X_test)} held out")
+
+    mlp, scaler = fine_tune(bundle, X, y)
+    profile = save_bundle(
+        profile_path(args.user), mlp, extractor, bundle.class_names, bundle.window, bundle.step, scaler
+    )
+    if X_test:
+        calibrated = load_bundle(profile)
+        for name, b in [("generic", bundle), ("calibrated", calibrated)]:
+            acc = np.mean([b.predict_one(x) == label for x, label in zip(X_test, y_test)])
+            print(f"{name:<10} held-out accuracy {acc:.3f}")
@@ -0,0 +1,179 @@
+"""
+NumPy-only inference for the trained sklearn models.
+
+scaler.transform() / model.predict() validate their input on every call,
+which costs far more than the (64, 32) MLP itself. mlp_arrays() /
+knn_arrays() take the fitted parameters (scaler mean/scale, layer weights,
+or the KNN training set) as plain arrays, and CompiledMLP / CompiledKNN run
+the same float64 math as sklearn, so predictions and probabilities are
+identical:
+
+    mlp = CompiledMLP(mlp_arrays(model, scaler))
+    scaled = mlp.transform(feats)  # scaler.transform([feats])[0]
+    pred = mlp.predict_one(scaled, scaled=True)  # model.predict([scaled])[0]
+
+    knn = CompiledKNN(knn_arrays(model))
+    pred = knn.predict_one(reduced)
+
+model_bundle.save_bundle() stores these arrays in a bundle and load_bundle()
+returns the compiled model.
+"""
+
+import numpy as np
+from scipy.special import expit
+
+
+# --------------------------
+# Parameters
+# --------------------------
+def mlp_arrays(model, scaler=None):
+    """Parameters of an MLPClassifier (plus its StandardScaler) as arrays."""
+    n = model.n_features_in_
+    mean = getattr(scaler, "mean_", None)
+    scale = getattr(scaler, "scale_", None)
+    arrays = {
+        "mean": np.zeros(n) if mean is None else mean,
+        "scale": np.ones(n) if scale is None else scale,
+        "classes": model.classes_,
+        "activation": np.array(model.activation),
+        "out_activation": np.array(model.out_activation_),
+        "n_layers": np.array(len(model.coefs_)),
+    }
+    for i, (W, b) in enumerate(zip(model.coefs_, model.intercepts_)):
+        arrays[f"W{i}"] = W
+        arrays[f"b{i}"] = b
+    return arrays
+
+
+def knn_arrays(model):
+    """Training set and settings of a KNeighborsClassifier as arrays."""
+    if model.effective_metric_ not in ("euclidean", "manhattan", "minkowski"):
+        raise ValueError(f"Unsupported KNN metric {model.effective_metric_!r}")
+    if callable(model.weights):
+        raise ValueError("Callable KNN weights cannot be exported")
+    p = {"euclidean": 2, "manhattan": 1}.get(
+        model.effective_metric_, model.effective_metric_params_.get("p", model.p)
+    )
+    return {
+        "fit_X": model._fit_X,
+        "y": model._y,
+        "classes": model.classes_,
+        "n_neighbors": np.array(model.n_neighbors),
+        "weights": np.array(model.weights),
+        "p": np.array(p),
+    }
+
+
+# --------------------------
+# Inference
+# --------------------------
+_ACTIVATIONS = {
+    "identity": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0, out=x),
+    "tanh": lambda x: np.tanh(x, out=x),
+    "logistic": lambda x: expit(x, out=x),
+}
+
+
+class CompiledMLP:
+    """Forward pass of an MLP; `arrays` is mlp_arrays() or the arrays of a bundle."""
+
+    kind = "mlp"
+
+    def __init__(self, arrays):
+        self.mean = arrays["mean"]
+        self.scale = arrays["scale"]
+        self.classes = arrays["classes"]
+        self.activation = str(arrays["activation"])
+        self.out_activation = str(arrays["out_activation"])
+        n_layers = int(arrays["n_layers"])
+        self.weights = [arrays[f"W{i}"] for i in range(n_layers)]
+        self.biases = [arrays[f"b{i}"] for i in range(n_layers)]
+        self.n_features = len(self.mean)
+        self._hidden = _ACTIVATIONS[self.activation]
+
+    def transform(self, X):
+        """StandardScaler.transform (a single 1-D feature vector stays 1-D)."""
+        return (np.asarray(X, dtype=float) - self.mean) / self.scale
+
+    def _output(self, X, scaled):
+        x = np.atleast_2d(X if scaled else self.transform(X)).astype(float, copy=False)
+        for W, b in zip(self.weights[:-1], self.biases[:-1]):
+            x = x @ W
+            x += b
+            x = self._hidden(x)
+        out = x @ self.weights[-1]
+        out += self.biases[-1]
+        if self.out_activation == "softmax":
+            out = np.exp(out - out.max(axis=1, keepdims=True))
+            out /= out.sum(axis=1, keepdims=True)
+        else:
+            out = _ACTIVATIONS[self.out_activation](out)
+        return out
+
+    def predict_proba(self, X, scaled=False):
+        out = self._output(X, scaled)
+        if out.shape[1] == 1:  # binary: one logistic unit
+            return np.hstack([1 - out, out])
+        return out
+
+    def predict(self, X, scaled=False):
+        out = self._output(X, scaled)
+        if out.shape[1] == 1:
+            return self.classes[(out[:, 0] > 0.5).astype(int)]
+        return self.classes[np.argmax(out, axis=1)]
+
+    def predict_one(self, x, scaled=False):
+        return self.predict(np.asarray(x)[None], scaled)[0]
+
+
+class CompiledKNN:
+    """Neighbour vote of a KNN; `arrays` is knn_arrays() or the arrays of a bundle."""
+
+    kind = "knn"
+
+    def __init__(self, arrays):
+        self.fit_X = arrays["fit_X"]
+        self.y = arrays["y"]
+        self.classes = arrays["classes"]
+        self.n_neighbors = int(arrays["n_neighbors"])
+        self.weights = str(arrays["weights"])
+        self.p = float(arrays["p"])
+        self.n_features = self.fit_X.shape[1]
+
+    def _distances(self, X):
+        diff = np.abs(np.atleast_2d(np.asarray(X, dtype=float))[:, None, :] - self.fit_X)
+        if self.p == 2:
+            return np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+        if self.p == 1:
+            return diff.sum(axis=2)
+        return (diff**self.p).sum(axis=2) ** (1 / self.p)
+
+    def predict_proba(self, X):
+        dist = self._distances(X)
+        k = self.n_neighbors
+        idx = np.argsort(dist, axis=1, kind="stable")[:, :k]
+        labels = self.y[idx]
+        if self.weights == "distance":
+            d = np.take_along_axis(dist, idx, axis=1)
+            with np.errstate(divide="ignore"):
+                w = 1.0 / d
+            exact = np.isinf(w)
+            w[exact.any(axis=1)] = exact[exact.any(axis=1)]  # exact matches win
+        else:
+            w = np.ones_like(labels, dtype=float)
+        proba = np.zeros((len(labels), len(self.classes)))
+        np.add.at(proba, (np.arange(len(labels))[:, None], labels), w)
+        return proba / proba.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        return self.classes[np.argmax(self.predict_proba(X), axis=1)]
+
+    def predict_one(self, x):
+        if self.weights != "uniform" or self.p != 2:
+            return self.predict(np.asarray(x)[None])[0]
+        # Single query, uniform votes: ties go to the smallest class like sklearn
+        diff = np.asarray(x, dtype=float) - self.fit_X
+        dist = np.sqrt(np.einsum("jk,jk->j", diff, diff))
+        idx = np.argsort(dist, kind="stable")[: self.n_neighbors]
+        return self.classes[np.bincount(self.y[idx], minlength=len(self.classes)).argmax()]
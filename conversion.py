@@ -0,0 +1,122 @@
+"""
+Raw ADC codes to physical units through lookup tables.
+
+bsnb.raw_to_phy() converts and truncates every value in Python, which makes
+it the most expensive call in the feature extraction. Since the input is an
+integer code, each (sensor, device, resolution, unit) conversion is a table
+with one entry per code: the table is built once with bsnb itself (so the
+results are bit-identical), saved in LUT_CACHE_DIR and after that every
+conversion is a single np.take().
+
+    emg_mv = to_phy("EMG", raw, "mV")
+    acc_g = to_phy("ACC", raw, "g")
+    ecg_v = to_phy("ECG", -raw, "V")  # negative codes use a signed table
+    eeg_uv = adc_to_microvolt(raw)  # hand-tuned EEG gain of the EEG scripts
+"""
+
+import os
+
+import numpy as np
+
+LUT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".lut_cache")
+DEVICE = "biosignalsplux"
+RESOLUTION = 16
+
+# EEG conversion used by the blink / brainwave scripts
+EEG_VCC = 3.0
+EEG_GAIN = 41780.0
+
+_tables = {}
+_cast_tables = {}
+
+
+def _build(sensor, option, resolution, device, signed):
+    import biosignalsnotebooks as bsnb
+
+    top = 2**resolution
+    codes = np.arange(-top + 1 if signed else 0, top)
+    return np.asarray(bsnb.raw_to_phy(sensor, device, codes, resolution, option), dtype=float)
+
+
+def table(sensor, option, resolution=RESOLUTION, device=DEVICE, signed=False):
+    """
+    Lookup table of bsnb.raw_to_phy(sensor, device, codes, resolution, option).
+
+    Index = code, or code + 2**resolution - 1 for a signed table (codes
+    -(2**resolution - 1) .. 2**resolution - 1).
+    """
+    key = (sensor, option, resolution, device, signed)
+    if key not in _tables:
+        name = f"{sensor}_{option}_{device}_{resolution}{'_signed' if signed else ''}.npy"
+        path = os.path.join(LUT_CACHE_DIR, name)
+        try:
+            lut = np.load(path)
+        except (OSError, ValueError):
+            lut = _build(sensor, option, resolution, device, signed)
+            try:
+                os.makedirs(LUT_CACHE_DIR, exist_ok=True)
+                np.save(path, lut)
+            except OSError as e:
+                print("⚠️ Could not cache conversion table:", e)
+        lut.setflags(write=False)
+        _tables[key] = lut
+    return _tables[key]
+
+
+def _lookup(lut, codes, offset, out, dtype):
+    if dtype is not None and np.dtype(dtype) != lut.dtype:
+        key = (id(lut), np.dtype(dtype).str)
+        if key not in _cast_tables:
+            _cast_tables[key] = lut.astype(dtype)
+        lut = _cast_tables[key]
+    if offset:
+        codes = codes + offset
+    return np.take(lut, codes, out=out)
+
+
+def to_phy(sensor, raw, option, resolution=RESOLUTION, device=DEVICE, out=None, dtype=None):
+    """
+    Same values as bsnb.raw_to_phy(sensor, device, raw, resolution, option).
+
+    `raw` may be any int array, or a float array of whole numbers (e.g. a
+    RingBuffer); non-integer values (interpolated gap fills) fall back to
+    bsnb. Pass dtype=np.float32 and/or a preallocated `out` to avoid the
+    float64 result array.
+    """
+    raw = np.asarray(raw)
+    codes = raw.astype(np.int64) if raw.dtype.kind != "i" else raw
+    exact = None
+    if raw.dtype.kind == "f":
+        exact = codes == raw
+        if exact.all():
+            exact = None
+        else:
+            codes = np.where(exact, codes, 0)
+
+    signed = codes.size > 0 and codes.min() < 0
+    lut = table(sensor, option, resolution, device, signed)
+    result = _lookup(lut, codes, 2**resolution - 1 if signed else 0, out, dtype)
+
+    if exact is not None:
+        import biosignalsnotebooks as bsnb
+
+        result[~exact] = bsnb.raw_to_phy(sensor, device, raw[~exact], resolution, option)
+    return result
+
+
+def adc_to_microvolt(adc, vcc=EEG_VCC, gain=EEG_GAIN, out=None, dtype=None):
+    """EEG in µV as ((adc / 65535) - 0.5) * (vcc / gain) * 1e6, via a table."""
+    key = ("EEG", "uV", vcc, gain)
+    if key not in _tables:
+        codes = np.arange(2**16, dtype=float)
+        eeg_v = ((codes / (2**16 - 1)) - 0.5) * (vcc / gain)
+        lut = eeg_v * 1e6
+        lut.setflags(write=False)
+        _tables[key] = lut
+    adc = np.asarray(adc)
+    codes = adc.astype(np.int64) if adc.dtype.kind != "i" else adc
+    if adc.dtype.kind == "f" and not np.array_equal(codes, adc):
+        # Interpolated values: same formula, no table
+        eeg_v = ((adc / (2**16 - 1)) - 0.5) * (vcc / gain)
+        return eeg_v * 1e6
+    return _lookup(_tables[key], codes, 0, out, dtype)
@@ -0,0 +1,253 @@
+"""
+All recordings in one memory-mapped, columnar dataset store.
+
+build_store() ingests OpenSignals recordings (data_1/, data_2/, min_data/,
+recordings/ ...) into STORE_DIR:
+
+    CH1.npy .. CH6.npy  one uint16 array per analog channel, all recordings
+                        back to back (zeros where a channel was not recorded)
+    index.npy           one row per recording: path, gesture, label, subject,
+                        trial, device, fs, start, length, channels
+
+Gesture, subject and trial come from the file name (parse_name), so the
+training scripts no longer split names themselves. Recordings with the same
+samples (e.g. a session exported both as .txt and as .h5) are stored once.
+
+    store = DatasetStore()
+    rows = store.select(subject="hayato", label=[1, 2])
+    for row, windows in store.windows(rows, ["CH2", "CH4"], 500, 250):
+        ...  # windows["CH2"]: (n_windows, 500) view into CH2.npy
+    X, y, groups = store.features(extractor, rows, {"flexor": "CH2", "extensor": "CH4"}, 500, 250)
+
+    python dataset_store.py data_1 data_2 min_data
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+from collections import Counter
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import opensignals
+from replay_device import expand_paths
+
+STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dataset")
+DEFAULT_SOURCES = ["data_1", "data_2", "min_data"]
+CHANNELS = [f"CH{ch}" for ch in range(1, opensignals.N_ANALOG + 1)]
+
+# MLP label order (rock_paper_scissors_2.py)
+GESTURES = ["relax", "rock", "paper", "scissors"]
+# "<class>_<trial>.txt" / "class_<n>/" numbering of the KNN data (README)
+KNN_CLASSES = {0: "relax", 1: "paper", 2: "rock", 3: "scissors"}
+
+INDEX_DTYPE = np.dtype(
+    [
+        ("path", "U256"),
+        ("gesture", "U16"),
+        ("label", "i2"),  # GESTURES index, -1 if unknown
+        ("subject", "U64"),
+        ("trial", "U64"),
+        ("device", "U32"),
+        ("fs", "i4"),
+        ("start", "i8"),  # sample offset in the CH*.npy arrays
+        ("length", "i8"),
+        ("channels", "u1"),  # bit n-1 set if CHn was recorded
+    ]
+)
+
+
+def _list_recordings(source):
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(folder, name)
+            for folder, _, names in os.walk(source)
+            for name in names
+            if name.endswith(".txt") or name.endswith(".h5")
+        )
+    return expand_paths(source)
+
+
+def parse_name(path):
+    """
+    (gesture, subject, trial) from the file name:
+
+        data_1/0_3.txt                  -> ("relax", "data_1", "3")
+        data_1/class_2/opensignals_...  -> ("rock", "data_1", "opensignals_...")
+        min_data/hayato_paper.h5        -> ("paper", "hayato", "hayato_paper")
+        recordings/session_....h5       -> ("", "recordings", "session_...")
+    """
+    folder, name = os.path.split(os.path.normpath(path))
+    stem = os.path.splitext(name)[0]
+    parent = os.path.basename(folder)
+
+    match = re.fullmatch(r"class_(\d+)", parent)
+    if match:
+        subject = os.path.basename(os.path.dirname(folder))
+        return KNN_CLASSES.get(int(match.group(1)), ""), subject, stem
+    match = re.fullmatch(r"(\d+)_(\d+)", stem)
+    if match:
+        return KNN_CLASSES.get(int(match.group(1)), ""), parent, match.group(2)
+    prefix, _, last = stem.rpartition("_")
+    if last in GESTURES:
+        return last, prefix or parent, stem
+    return "", parent, stem
+
+
+def _content_hash(data):
+    h = hashlib.sha1()
+    for ch in sorted(data):
+        h.update(ch.encode())
+        h.update(np.ascontiguousarray(data[ch]).tobytes())
+    return h.hexdigest()
+
+
+def build_store(sources=DEFAULT_SOURCES, root=STORE_DIR, parse=parse_name, verbose=True):
+    """Ingest every .txt/.h5 under `sources` into a new store at `root`."""
+    paths = [p for source in sources for p in _list_recordings(source)]
+
+    # Pass 1: lengths and duplicates (the loader's sidecars make pass 2 cheap)
+    rows, seen = [], {}
+    for path in paths:
+        data = opensignals.load(path)
+        key = _content_hash(data)
+        if key in seen:
+            if verbose:
+                print(f"⚠️ {path} has the same samples as {seen[key]}, skipped")
+            continue
+        seen[key] = path
+        info = opensignals.read_header(path)
+        gesture, subject, trial = parse(path)
+        rows.append(
+            (
+                path,
+                gesture,
+                GESTURES.index(gesture) if gesture in GESTURES else -1,
+                subject,
+                trial,
+                info.get("device name", info.get("macaddress", "")),
+                int(info["sampling rate"]),
+                0,
+                len(next(iter(data.values()))),
+                sum(1 << (int(ch[2:]) - 1) for ch in data),
+            )
+        )
+    index = np.array(rows, dtype=INDEX_DTYPE)
+    index["start"] = np.cumsum(index["length"]) - index["length"]
+    total = int(index["length"].sum())
+
+    # Pass 2: fill the channel columns
+    tmp = root + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    columns = {
+        ch: np.lib.format.open_memmap(
+            os.path.join(tmp, f"{ch}.npy"), mode="w+", dtype=np.uint16, shape=(total,)
+        )
+        for ch in CHANNELS
+    }
+    for row in index:
+        data = opensignals.load(str(row["path"]))
+        sl = slice(row["start"], row["start"] + row["length"])
+        for ch, values in data.items():
+            columns[ch][sl] = values
+    for column in columns.values():
+        column.flush()
+    del columns
+    np.save(os.path.join(tmp, "index.npy"), index)
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({"channels": CHANNELS, "gestures": GESTURES, "sources": list(sources)}, f)
+
+    shutil.rmtree(root, ignore_errors=True)
+    os.replace(tmp, root)
+    if verbose:
+        print(f"✅ {len(index)} recordings, {total} samples -> {root}")
+    return DatasetStore(root)
+
+
+class DatasetStore:
+    """Read side of a store written by build_store()."""
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self.index = np.load(os.path.join(root, "index.npy"))
+        with open(os.path.join(root, "meta.json")) as f:
+            self.meta = json.load(f)
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def column(self, ch):
+        """Memory-mapped samples of one channel over all recordings."""
+        if ch not in self._columns:
+            self._columns[ch] = np.load(os.path.join(self.root, f"{ch}.npy"), mmap_mode="r")
+        return self._columns[ch]
+
+    def select(self, **query):
+        """
+        Index rows matching every field, e.g. select(subject="hayato", label=[1, 2]);
+        a list / tuple / set matches any of its values.
+        """
+        mask = np.ones(len(self.index), dtype=bool)
+        for field, value in query.items():
+            if isinstance(value, (list, tuple, set)):
+                mask &= np.isin(self.index[field], list(value))
+            else:
+                mask &= self.index[field] == value
+        return self.index[mask]
+
+    def signal(self, row, channels=("CH2", "CH4")):
+        """{channel: memory-mapped samples} of one recording."""
+        sl = slice(row["start"], row["start"] + row["length"])
+        return {ch: self.column(ch)[sl] for ch in channels}
+
+    def windows(self, rows, channels, window, step):
+        """
+        Yields (row, {channel: (n_windows, window) view}) per recording, with the
+        windows starting at range(0, length - window, step) like the training scripts.
+        """
+        for row in rows:
+            n_windows = len(range(0, int(row["length"]) - window, step))
+            yield row, {
+                ch: sliding_window_view(x, window)[::step][:n_windows]
+                for ch, x in self.signal(row, channels).items()
+            }
+
+    def features(self, extractor, rows, channels, window, step):
+        """
+        (X, y, groups) for a feature_registry.FeatureExtractor over all windows of
+        `rows`; channels maps extractor channels to store channels, groups is
+        the index of the recording each window came from.
+        """
+        X, y, groups = [], [], []
+        for i, row in enumerate(rows):
+            signal = self.signal(row, channels.values())
+            feats = extractor.extract_windows(
+                {name: signal[ch] for name, ch in channels.items()}, window, step
+            )
+            X.append(feats)
+            y.append(np.full(len(feats), int(row["label"])))
+            groups.append(np.full(len(feats), i))
+        if not X:
+            return np.zeros((0, len(extractor.features))), np.zeros(0, int), np.zeros(0, int)
+        return np.concatenate(X), np.concatenate(y), np.concatenate(groups)
+
+    def summary(self):
+        counts = Counter(zip(self.index["subject"], self.index["gesture"]))
+        lines = [f"{len(self)} recordings in {self.root}"]
+        for (subject, gesture), n in sorted(counts.items()):
+            lines.append(f"  {subject:<20} {gesture or '?':<10} {n}")
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the memory-mapped dataset store")
+    parser.add_argument("sources", nargs="*", default=DEFAULT_SOURCES)
+    parser.add_argument("--out", default=STORE_DIR)
+    args = parser.parse_args()
+    print(build_store(args.sources, args.out).summary())
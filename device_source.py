@@ -0,0 +1,34 @@
+"""
+Pick where samples come from without touching the scripts.
+
+By default every script talks to the BITalino directly. Set BITALINO_SHARED=1
+(or to the stream name) to attach to a running shared_stream.py daemon
+instead, so several scripts can use the same device at once.
+
+Set BITALINO_REPLAY to a recording, folder or glob (e.g. "min_data/*.h5") to
+play recorded sessions instead of connecting to anything; see replay_device.py.
+"""
+
+import os
+
+from shared_stream import STREAM_NAME, SharedBITalino
+
+
+def open_device(mac):
+    """Return a BITalino-like device for `mac` (start/read/stop/close)."""
+    replay = os.environ.get("BITALINO_REPLAY")
+    if replay:
+        from replay_device import ReplayBITalino
+
+        speed = float(os.environ.get("BITALINO_REPLAY_SPEED", "1"))
+        return ReplayBITalino(replay, speed=speed)
+
+    shared = os.environ.get("BITALINO_SHARED")
+    if shared:
+        name = STREAM_NAME if shared == "1" else shared
+        print(f"Attaching to shared stream '{name}' instead of {mac} ...")
+        return SharedBITalino(name)
+
+    from bitalino import BITalino
+
+    return BITalino(mac)
@@ -0,0 +1,50 @@
+import numpy as np
+from scipy.signal import butter, filtfilt, find_peaks
+
+from conversion import to_phy
+
+
+def bandpass_filter(signal, fs, lowcut=0.5, highcut=40.0, order=4):
+    nyq = 0.5 * fs
+    low = lowcut / nyq
+    high = highcut / nyq
+    b, a = butter(order, [low, high], btype="band")
+    return filtfilt(b, a, signal)
+
+
+def compute_heart_rate(signal, fs):
+    # Convert raw → volts and then to mV
+    signal_V = to_phy("ECG", signal, "V")
+    signal_mV = signal_V * 1000
+
+    # --- Band-pass filter (0.5–40 Hz) ---
+    filtered = bandpass_filter(signal_mV, fs)
+
+    # # --- Auto-flip if inverted ---
+    # if np.mean(filtered) < 0:
+    #     filtered = -filtered
+
+    # --- Normalize amplitude if too small (<0.2 mV) ---
+    if np.std(filtered) < 0.2:
+        filtered = filtered * (0.2 / (np.std(filtered) + 1e-12))
+
+    # --- Adaptive threshold ---
+    thr = np.percentile(filtered, 95) * 0.6
+    thr = max(thr, 0.1)
+    # --- Smooth signal slightly to suppress T-waves ---
+    smoothness = 5  # Smoothing window size (1 disables smoothing)
+    filtered_smooth = np.convolve(filtered, np.ones(smoothness)/smoothness, mode='same')
+
+    # --- Require at least 0.6 s between R-peaks (≈100 BPM max) ---
+    min_distance = int(fs * 0.6)
+    peaks, _ = find_peaks(filtered_smooth, distance=min_distance, height=thr)
+    #  Alternative simpler peak detection without smoothing:
+
+    # peaks, _ = find_peaks(filtered, distance=fs * 0.25, height=thr)
+
+    bpm = 0.0
+    if len(peaks) > 1:
+        rr_intervals = np.diff(peaks) / fs
+        bpm = 60.0 / np.mean(rr_intervals)
+
+    return bpm, filtered
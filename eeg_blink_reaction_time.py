@@ -1,10 +1,13 @@
 import time, random
 import numpy as np
-from bitalino import BITalino
+from device_source import open_device
 from pyqtgraph.Qt import QtCore, QtWidgets
 import pyqtgraph as pg
 from PyQt5.QtGui import QPainter, QBrush, QColor, QPen
 
+import conversion
+from ring_buffer import RingBuffer
+
 # ===== CONFIG =====
 MAC_ADDRESS = "98:D3:11:FE:02:74"
 CHANNEL = 0
@@ -24,8 +27,7 @@ REACT_PLOT_Y_RANGE = WAIT_FOR_BLINK*1000  # ms
 cue_lines = []
 
 def adc_to_microvolt(adc):
-    eeg_v = ((adc / (2**16 - 1)) - 0.5) * (VCC / GAIN)
-    return eeg_v * 1e6
+    return conversion.adc_to_microvolt(adc, VCC, GAIN)
 
 
 class CueCircle(QtWidgets.QWidget):
@@ -93,10 +95,11 @@ main_layout.addWidget(react_plot)
 win.show()
 
 # --- BITalino setup ---
-device = BITalino(MAC_ADDRESS)
+device = open_device(MAC_ADDRESS)
 device.start(SAMPLING_RATE, [CHANNEL])
 
-buffer = np.zeros(0)
+buffer = RingBuffer(int(SAMPLING_RATE * MAX_VISIBLE_TIME))
+t_axis = np.arange(buffer.capacity) / SAMPLING_RATE
 cue_shown = False
 reaction_recorded = False
 cue_time = None
@@ -125,20 +128,19 @@ def start_new_trial(longer_wait=False):
 
 
 def update():
-    global buffer, cue_shown, reaction_recorded, cue_time, end_time
+    global cue_shown, reaction_recorded, cue_time, end_time
     global trial_count, reaction_times, cue_lines, counter_random_blink
 
     samples = device.read(N_SAMPLES)
     raw = samples[:, 5 + CHANNEL].astype(float)
     microvolt = adc_to_microvolt(raw)
     microvolt = abs(microvolt)
-    buffer = np.concatenate([buffer, microvolt])
-    if buffer.size > SAMPLING_RATE * MAX_VISIBLE_TIME:
-        buffer = buffer[-int(SAMPLING_RATE * MAX_VISIBLE_TIME) :]
+    buffer.extend(microvolt)
+    history = buffer.latest()[:, 0]
 
     # Update EEG plot
-    t = np.arange(buffer.size) / SAMPLING_RATE
-    curve.setData(t, buffer)
+    t = t_axis[: len(history)]
+    curve.setData(t, history)
     plot.setXRange(max(0, t[-1] - MAX_VISIBLE_TIME), t[-1])
 
     counter_random_blink += 1
@@ -1,12 +1,18 @@
 # neurofeedback_clean_ratio.py
 import time
 import numpy as np
-from bitalino import BITalino
-from scipy.signal import butter, lfilter, welch
+from device_source import open_device
+from scipy.signal import butter, lfilter
 from pyqtgraph.Qt import QtCore, QtWidgets
 import pyqtgraph as pg
 from scipy.signal import butter, sosfiltfilt
 
+import conversion
+from acquisition import AcquisitionThread
+from recorder import recorder_from_env
+from ring_buffer import RingBuffer
+from spectral_engine import band_power, get_engine
+
 # ===== CONFIG =====
 macAddress = "98:D3:11:FE:02:74"  # Your BITalino MAC address
 CHANNEL = 0  # Analog input channel
@@ -34,14 +40,12 @@ def bandpass_filter(data, lowcut, highcut, fs):
 
 
 def adc_to_microvolt(adc):
-    eeg_v = ((adc / (2**16 - 1)) - 0.5) * (VCC / GAIN)
-    return eeg_v * 1e6
+    return conversion.adc_to_microvolt(adc, VCC, GAIN)
 
 
 def compute_band_power(signal, fs, band):
-    f, psd = welch(signal, fs=fs, nperseg=256)
-    idx = np.logical_and(f >= band[0], f <= band[1])
-    return np.trapz(psd[idx], f[idx])
+    f, psd = get_engine(fs).psd(signal)
+    return band_power(f, psd, band)
 
 
 def bandpass_sos(low, high, fs, order=4):
@@ -59,7 +63,8 @@ def band_power_time_domain(x, low, high, fs):
 # --- GUI setup ---
 app = QtWidgets.QApplication([])
 win = QtWidgets.QWidget()
-win.setWindowTitle("Neurofeedback (EEG, Alpha, Beta, Gamma)")
+TITLE = "Neurofeedback (EEG, Alpha, Beta, Gamma)"
+win.setWindowTitle(TITLE)
 
 layout = QtWidgets.QVBoxLayout()
 win.setLayout(layout)
@@ -98,35 +103,47 @@ win.resize(1800, 1200)  # Set width to 1200 and height to 800
 
 win.show()
 
-device = BITalino(macAddress)
+device = open_device(macAddress)
 device.start(fs, [CHANNEL])
 
-buffer = np.zeros((0, 1))
+buffer = RingBuffer(max_samples + fs)  # 1 s headroom for the reader
+t_axis = np.arange(max_samples) / fs
 last_update_time = time.time()
+last_total = 0
+
+# --- Read and convert in the background, the timer only renders ---
+recorder = recorder_from_env(fs, [CHANNEL], "eeg_brainwaves", ["EEGBITREV"])
+acquisition = AcquisitionThread(
+    device,
+    nSamples,
+    buffer,
+    transform=lambda s: adc_to_microvolt(s[:, 5 + CHANNEL].astype(float)),
+    fs=fs,
+    fill="interp",
+    recorder=recorder,
+)
+acquisition.start()
 
 
 def update():
-    global buffer, last_update_time
+    global last_update_time, last_total
     try:
-        # --- Read and update rolling buffer ---
-        samples = device.read(nSamples)
-        raw = samples[:, 5 + CHANNEL].astype(float)
-        raw_uV = adc_to_microvolt(raw).reshape(-1, 1)
-        buffer = np.vstack([buffer, raw_uV])
-        if buffer.shape[0] > max_samples:
-            buffer = buffer[-max_samples:]
+        total = buffer.total
+        if total == last_total:
+            return
+        last_total = total
+        history = buffer.latest(max_samples, end=total)[:, 0]
 
         # --- Time axis for 5s rolling window ---
-        t = np.arange(buffer.shape[0]) / fs
-        curve_raw.setData(t, buffer[:, 0])
+        t = t_axis[: len(history)]
+        curve_raw.setData(t, history)
         plot_raw.setXRange(max(0, t[-1] - history_secs), t[-1])
 
         # --- Band Power Computation (every 0.25 s) ---
-        if (time.time() - last_update_time > update_period) and buffer.shape[
-            0
-        ] >= window_size:
-            window = buffer[:, 0]
-            power_window = buffer[-1000:]
+        if (time.time() - last_update_time > update_period) and len(
+            buffer
+        ) >= window_size:
+            window = history
 
             alpha = bandpass_filter(window, 8, 13, fs)
             beta = bandpass_filter(window, 13, 30, fs)
@@ -140,6 +157,8 @@ def update():
             beta_p, beta = band_power_time_domain(window, 13, 30, fs)
             gamma_p, gamma = band_power_time_domain(window, 30, 45, fs)
             ratio = alpha_p / (beta_p + 1e-9)  # true physical ratio
+            if recorder:
+                recorder.annotate(f"alpha/beta {ratio:.3f}")
 
             # --- Update filtered plots ---
             curve_alpha.setData(alpha)
@@ -169,9 +188,20 @@ timer = QtCore.QTimer()
 timer.timeout.connect(update)
 timer.start(int(1000 * nSamples / fs))
 
+# Lost frames / overruns in the title bar, refreshed once per second
+status_timer = QtCore.QTimer()
+status_timer.timeout.connect(
+    lambda: win.setWindowTitle(f"{TITLE} | {acquisition.status_text()}")
+)
+status_timer.start(1000)
+
 
 def close_app():
     print("Stopping BITalino...")
+    acquisition.stop()
+    print("Acquisition:", acquisition.stats_text())
+    if recorder:
+        recorder.close()
     device.stop()
     device.close()
     app.quit()
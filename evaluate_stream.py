@@ -0,0 +1,260 @@
+"""
+Streaming evaluation of a model bundle on held-out recordings.
+
+A random split of overlapping windows leaks neighbouring windows into the
+test set and says nothing about the live behaviour. Here every recording is
+replayed chunk by chunk through the live path of life_classification_2.py:
+RingBuffer, inference_worker.WindowClassifier (bundle extractor,
+normalisation, model) every chunk, then the GestureDecoder. To get a gesture onset, each
+recording is preceded by the last `lead_secs` of a recording of the same
+subject with a different gesture (relax before a gesture, a gesture before
+relax), and the decoder has settled on that gesture when the target starts.
+
+Per recording it reports
+    window acc   raw model accuracy on windows entirely inside the target
+    stream acc   decoded gesture accuracy over all decisions after the onset
+    latency      seconds from the onset to the first correct decoded gesture
+    flips/min    decoded changes after that first correct decision
+    windows/s    classification throughput
+
+Recordings are replayed in parallel (one per process), from the files or,
+with --store, from the memory-mapped dataset store (patterns then match the
+paths in its index; without patterns every labelled recording is used):
+
+    python evaluate_stream.py min_data/hayato_*.h5
+    python evaluate_stream.py --bundle model_2/emg_mlp.bundle --preset stable "min_data/*.h5"
+    python evaluate_stream.py --store "min_data/hayato_*"
+"""
+
+import argparse
+import fnmatch
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+import opensignals
+from dataset_store import GESTURES, STORE_DIR, DatasetStore, parse_name
+from gesture_decoder import DECODER_PRESETS, GestureDecoder
+from inference_worker import WindowClassifier
+from model_bundle import load_bundle
+from parallel_features import pool_context
+from replay_device import expand_paths
+from ring_buffer import RingBuffer
+
+BUNDLE_PATH = "model_2/emg_mlp.bundle"
+CHUNK = 50  # samples per device.read() / classification, as in life_classification_2.py
+LEAD_SECS = 3.0
+# Recording channels of the named extractor channels (CHn map to themselves)
+CHANNEL_MAP = {"flexor": "CH2", "extensor": "CH4"}
+
+
+class Episode(NamedTuple):
+    path: str
+    gesture: str
+    lead_path: Optional[str]  # recording replayed before the target (None: cold start)
+    lead_gesture: str
+
+
+class EpisodeResult(NamedTuple):
+    path: str
+    gesture: str
+    lead_gesture: str
+    windows: int
+    window_acc: float
+    stream_acc: float
+    latency: float  # seconds, nan if the gesture was never decoded
+    flips_per_min: float
+    windows_per_sec: float
+
+
+def episodes(paths, parse=parse_name):
+    """Episode per recording with a known gesture, with a lead-in of the same subject."""
+    info = [(path, *parse(path)) for path in paths]
+    by_subject = defaultdict(dict)
+    for path, gesture, subject, _ in info:
+        if gesture:
+            by_subject[subject].setdefault(gesture, path)
+    out = []
+    for path, gesture, subject, _ in info:
+        if not gesture:
+            continue
+        others = by_subject[subject]
+        lead = "relax" if gesture != "relax" else next(
+            (g for g in others if g != "relax"), None
+        )
+        if lead not in others:
+            lead = None
+        out.append(Episode(path, gesture, others.get(lead), lead or ""))
+    return out
+
+
+_bundles = {}
+_stores = {}
+
+
+def _bundle(path):
+    # One bundle per process, reused across episodes
+    if path not in _bundles:
+        bundle = load_bundle(path)
+        _bundles[path] = bundle, bundle.extractor()
+    return _bundles[path]
+
+
+def _store(root):
+    # One store (and its row lookup) per process
+    if root not in _stores:
+        store = DatasetStore(root)
+        _stores[root] = store, {str(row["path"]): row for row in store.index}
+    return _stores[root]
+
+
+def _signal(path, extractor, store_root=None):
+    names = {ch: CHANNEL_MAP.get(ch, ch) for ch in extractor.channels}
+    if store_root is None:
+        data = opensignals.load(path, list(dict.fromkeys(names.values())))
+    else:
+        store, rows = _store(store_root)
+        data = store.signal(rows[path], list(dict.fromkeys(names.values())))
+    return np.stack([data[names[ch]] for ch in extractor.channels], axis=1).astype(float)
+
+
+def run_episode(
+    episode, bundle_path=BUNDLE_PATH, preset="balanced", lead_secs=LEAD_SECS, store_root=None
+):
+    """Replay one episode through the live path and score it (store_root: read the dataset store)."""
+    bundle, extractor = _bundle(bundle_path)
+    classes = [int(c) for c in bundle.model.classes]
+    truth = bundle.class_names.index(episode.gesture)
+    window = bundle.window
+
+    target = _signal(episode.path, extractor, store_root)
+    onset = 0
+    decoder = GestureDecoder(len(classes), **DECODER_PRESETS[preset])
+    if episode.lead_path:
+        lead = _signal(episode.lead_path, extractor, store_root)[-int(lead_secs * bundle.fs) :]
+        onset = len(lead)
+        target = np.concatenate([lead, target])
+        lead_class = bundle.class_names.index(episode.lead_gesture)
+        decoder.initial = classes.index(lead_class)
+        decoder.reset()
+
+    buffer = RingBuffer(window + bundle.fs, target.shape[1])
+    classifier = WindowClassifier(
+        bundle, extractor, {ch: i for i, ch in enumerate(extractor.channels)}
+    )
+    ends, raw_labels, decoded = [], [], []
+    t0 = time.perf_counter()
+    for start in range(0, len(target) - CHUNK + 1, CHUNK):
+        buffer.extend(target[start : start + CHUNK])
+        if buffer.total < window:
+            continue
+        label, proba, _, _ = classifier(buffer, buffer.total)
+        ends.append(buffer.total)
+        raw_labels.append(label)
+        decoded.append(classes[decoder.update(proba)])
+    elapsed = time.perf_counter() - t0
+
+    ends, raw_labels, decoded = np.array(ends), np.array(raw_labels), np.array(decoded)
+    inside = ends - window >= onset
+    after = ends > onset
+    correct = np.flatnonzero(after & (decoded == truth))
+    if len(correct):
+        first = correct[0]
+        latency = (ends[first] - onset) / bundle.fs
+        flips = np.count_nonzero(np.diff(decoded[first:]))
+        minutes = (ends[-1] - ends[first]) / bundle.fs / 60
+        flips_per_min = flips / minutes if minutes > 0 else 0.0
+    else:
+        latency = flips_per_min = float("nan")
+    return EpisodeResult(
+        episode.path,
+        episode.gesture,
+        episode.lead_gesture,
+        len(ends),
+        float(np.mean(raw_labels[inside] == truth)) if inside.any() else float("nan"),
+        float(np.mean(decoded[after] == truth)) if after.any() else float("nan"),
+        latency,
+        flips_per_min,
+        len(ends) / elapsed if elapsed > 0 else float("inf"),
+    )
+
+
+def _run(args):
+    return run_episode(*args)
+
+
+def evaluate(
+    paths, bundle_path=BUNDLE_PATH, preset="balanced", lead_secs=LEAD_SECS, workers=None, store=None
+):
+    """
+    EpisodeResult per recording of `paths` (in order), replayed in parallel.
+    With a DatasetStore, `paths` are paths of its index (e.g.
+    store.select(subject="hayato")["path"]); gesture and subject come from
+    the index and the samples from the store.
+    """
+    parse, store_root = parse_name, None
+    if store is not None:
+        _, rows = _store(store.root)
+        parse = lambda path: tuple(str(rows[path][f]) for f in ("gesture", "subject", "trial"))  # noqa: E731
+        store_root = store.root
+    jobs = [(ep, bundle_path, preset, lead_secs, store_root) for ep in episodes(paths, parse)]
+    workers = min(workers or os.cpu_count() or 1, max(len(jobs), 1))
+    if workers == 1:
+        return [_run(job) for job in jobs]
+    with ProcessPoolExecutor(workers, mp_context=pool_context()) as pool:
+        return list(pool.map(_run, jobs))
+
+
+def report(results, title=""):
+    lines = [title] if title else []
+    lines.append(
+        f"{'recording':<32} {'lead':<9} {'windows':>7} {'win acc':>8} {'str acc':>8} "
+        f"{'latency':>8} {'flips/min':>9} {'win/s':>8}"
+    )
+    for r in results:
+        name = f"{os.path.basename(r.path)} ({r.gesture})"
+        lines.append(
+            f"{name:<32} {r.lead_gesture or '-':<9} {r.windows:>7} {r.window_acc:>8.3f} "
+            f"{r.stream_acc:>8.3f} {r.latency:>7.2f}s {r.flips_per_min:>9.1f} "
+            f"{r.windows_per_sec:>8.0f}"
+        )
+    if results:
+        windows = sum(r.windows for r in results)
+        mean = lambda field: np.nanmean([getattr(r, field) for r in results])  # noqa: E731
+        lines.append(
+            f"{'mean':<32} {'':<9} {windows:>7} {mean('window_acc'):>8.3f} "
+            f"{mean('stream_acc'):>8.3f} {mean('latency'):>7.2f}s "
+            f"{mean('flips_per_min'):>9.1f} {mean('windows_per_sec'):>8.0f}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay held-out recordings through the live classifier")
+    parser.add_argument("recordings", nargs="*", help="files, folders or glob patterns")
+    parser.add_argument("--store", action="store_true", help="replay from the dataset store (dataset_store.py)")
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    parser.add_argument("--bundle", action="append", help=f"model bundle(s) (default {BUNDLE_PATH})")
+    parser.add_argument("--preset", default="balanced", choices=sorted(DECODER_PRESETS))
+    parser.add_argument("--lead", type=float, default=LEAD_SECS, help="lead-in seconds before each recording")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    store = DatasetStore(args.store_dir) if args.store else None
+    if store is not None:
+        labelled = [str(path) for path in store.select(label=list(range(len(GESTURES))))["path"]]
+        patterns = args.recordings or ["*"]
+        paths = [p for p in labelled if any(fnmatch.fnmatch(p, pattern) for pattern in patterns)]
+    else:
+        paths = [p for pattern in args.recordings for p in expand_paths(pattern)]
+    if not paths:
+        parser.error("no recordings")
+    for bundle_path in args.bundle or [BUNDLE_PATH]:
+        t0 = time.time()
+        results = evaluate(paths, bundle_path, args.preset, args.lead, args.workers, store)
+        print(report(results, f"{bundle_path} ({args.preset}), {time.time() - t0:.1f} s"))
+        print()
@@ -0,0 +1,117 @@
+"""
+Content-addressed cache of extracted features for training runs.
+
+Features of a recording only change when the file, the channel selection,
+the windowing or the feature set change, so those make up the cache key:
+
+    sha1(file bytes), {extractor channel: file channel}, start, window,
+    step, FeatureExtractor.version
+
+On a hit the recording is not even loaded; the .npy in FEATURE_CACHE_DIR is
+returned memory-mapped (read only). On a miss the file is loaded with
+opensignals.load(), the features are computed and saved atomically.
+
+    extractor = FeatureExtractor(EMG_FEATURES, EMG_CHANNELS, fs)
+    X = cached_features("min_data/one_min_rock.h5",
+                        {"flexor": "CH2", "extensor": "CH4"}, extractor, 500, 250)
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+import opensignals
+
+FEATURE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".feature_cache")
+
+stats = {"hits": 0, "misses": 0}
+_file_hashes = {}
+
+
+def file_hash(path):
+    """sha1 of the file contents (remembered per path, size and mtime)."""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if key not in _file_hashes:
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        _file_hashes[key] = h.hexdigest()
+    return _file_hashes[key]
+
+
+def cache_key(path, channels, extractor, window=None, step=None, start=0):
+    spec = {
+        "file": file_hash(path),
+        "channels": sorted(channels.items()),
+        "start": int(start),
+        "window": window,
+        "step": step,
+        "features": extractor.version,
+    }
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+def _load_raw(path, channels, start):
+    data = opensignals.load(path, sorted(set(channels.values())))
+    return {name: np.asarray(data[label])[start:] for name, label in channels.items()}
+
+
+def _load(path):
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:
+        return np.load(path)  # empty arrays cannot be memory-mapped
+
+
+def _save(path, features):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, features)
+    os.replace(tmp, path)
+
+
+def cache_path(path, channels, extractor, window=None, step=None, start=0):
+    name = os.path.splitext(os.path.basename(path))[0]
+    key = cache_key(path, channels, extractor, window, step, start)
+    return os.path.join(FEATURE_CACHE_DIR, f"{name}_{key[:16]}.npy")
+
+
+def lookup(path, channels, extractor, window=None, step=None, start=0):
+    """The cached features, or None if they still have to be computed."""
+    try:
+        features = _load(cache_path(path, channels, extractor, window, step, start))
+    except (OSError, ValueError):
+        return None
+    stats["hits"] += 1
+    return features
+
+
+def cached_features(path, channels, extractor, window=None, step=None, start=0):
+    """
+    extractor features of one recording, from the cache when possible.
+
+    channels: {extractor channel: channel label in the file}, e.g. {"CH2": "CH2"}
+    window/step: sliding windows (extractor.extract_windows -> (n_windows,
+    n_features)); None for one feature vector of the whole recording.
+    start: samples to drop at the beginning of every channel.
+    """
+    features = lookup(path, channels, extractor, window, step, start)
+    if features is not None:
+        return features
+
+    raw = _load_raw(path, channels, start)
+    if window is None:
+        features = extractor.extract(raw)
+    else:
+        features = extractor.extract_windows(raw, window, step)
+    stats["misses"] += 1
+    try:
+        _save(cache_path(path, channels, extractor, window, step, start), features)
+    except OSError as e:
+        print("⚠️ Could not cache features:", e)
+    return features
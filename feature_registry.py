@@ -0,0 +1,250 @@
+"""
+Named features, declared once for training and live inference.
+
+A feature is a function of one or more channel contexts. A context converts
+its raw channel on first use and caches every intermediate step (diff, PSD,
+...), so features that share a step compute it only once. Each step and
+feature declares what it depends on and a rough relative cost, which lets
+an extractor built from a mask (e.g. the RFE selection in
+model/acception_labels.npy) skip everything the model does not use.
+
+All functions work on the last axis, so the same extractor handles one
+window (1-D) or a stack of sliding windows (2-D).
+
+    extractor = FeatureExtractor(KNN_FEATURES, KNN_CHANNELS, mask=acception_labels)
+    feats = extractor.extract({"CH2": flex_raw, "CH3": acc_raw, "CH4": add_raw})
+"""
+
+import hashlib
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from conversion import to_phy
+from spectral_engine import centroid_entropy, get_engine
+
+
+# Bump when a feature or step definition changes (invalidates feature_cache)
+FEATURE_SET_VERSION = 1
+
+
+class Step:
+    """Intermediate result shared between features of one channel."""
+
+    def __init__(self, func, deps=(), cost=1):
+        self.func = func
+        self.deps = tuple(deps)
+        self.cost = cost
+
+
+class Feature:
+    """A named feature: func(*contexts) -> value per window."""
+
+    def __init__(self, func, deps=("x",), cost=1, n_channels=1):
+        self.func = func
+        self.deps = tuple(deps)
+        self.cost = cost
+        self.n_channels = n_channels
+
+
+def _slope(x):
+    # Least-squares slope against the sample index (linregress(range(n), x)[0])
+    t = np.arange(x.shape[-1]) - (x.shape[-1] - 1) / 2
+    return np.sum(t * (x - np.mean(x, axis=-1, keepdims=True)), axis=-1) / np.sum(t * t)
+
+
+STEPS = {
+    "x": Step(None, cost=1),  # raw -> physical units, done by the context
+    "dx": Step(lambda c: np.diff(c["x"], axis=-1), ("x",)),
+    "abs_dx": Step(lambda c: np.abs(c["dx"]), ("dx",)),
+    "psd": Step(lambda c: get_engine(c.fs).psd(c["x"]), ("x",), cost=20),
+    "spectral": Step(lambda c: centroid_entropy(*c["psd"]), ("psd",), cost=2),
+}
+
+FEATURES = {
+    "std": Feature(lambda c: np.std(c["x"], axis=-1)),
+    "max": Feature(lambda c: np.max(c["x"], axis=-1)),
+    "mean": Feature(lambda c: np.mean(c["x"], axis=-1)),
+    "std_abs": Feature(lambda c: np.std(np.abs(c["x"]), axis=-1), cost=2),
+    # Sign changes per sample (feature_utils / live MLP)
+    "zcr": Feature(
+        lambda c: np.sum(np.diff(np.sign(c["x"]), axis=-1) != 0, axis=-1) / c["x"].shape[-1],
+        cost=2,
+    ),
+    # x[i] * x[i-1] <= 0 per sample pair (rock_paper_scissor.ipynb / KNN)
+    "zcr_product": Feature(
+        lambda c: np.sum(c["x"][..., 1:] * c["x"][..., :-1] <= 0, axis=-1)
+        / (c["x"].shape[-1] - 1),
+        cost=2,
+    ),
+    "wl": Feature(lambda c: np.sum(c["abs_dx"], axis=-1), ("abs_dx",)),
+    "wamp": Feature(lambda c: np.sum(c["abs_dx"] > 0.02, axis=-1), ("abs_dx",)),
+    "spectral_centroid": Feature(lambda c: c["spectral"][0], ("spectral",)),
+    "spectral_entropy": Feature(lambda c: c["spectral"][1], ("spectral",)),
+    "slope": Feature(lambda c: _slope(c["x"]), cost=3),
+    "std_ratio": Feature(
+        lambda a, b: (np.std(a["x"], axis=-1) + 1e-6) / (np.std(b["x"], axis=-1) + 1e-6),
+        n_channels=2,
+    ),
+}
+
+
+class _Context:
+    """One channel's converted signal plus lazily computed steps."""
+
+    def __init__(self, raw, sensor, unit, fs, converted=False):
+        self.fs = fs
+        self._raw = raw
+        self._sensor = sensor
+        self._unit = unit
+        self._values = {"x": raw} if converted else {}
+
+    def __getitem__(self, key):
+        if key not in self._values:
+            if key == "x":
+                self._values[key] = to_phy(self._sensor, self._raw, self._unit)
+            else:
+                self._values[key] = STEPS[key].func(self)
+        return self._values[key]
+
+
+def _step_closure(deps):
+    todo, seen = list(deps), set()
+    while todo:
+        key = todo.pop()
+        if key not in seen:
+            seen.add(key)
+            todo.extend(STEPS[key].deps)
+    return seen
+
+
+class FeatureExtractor:
+    """
+    Computes a list of (feature, channels) entries, optionally masked.
+
+    features: e.g. [("std", ("CH2",)), ("std_ratio", ("CH2", "CH4"))]
+    channels: {channel: (sensor, unit)} for the raw -> physical conversion
+    mask: boolean array over `features`; only the True entries are computed
+    """
+
+    def __init__(self, features, channels, fs=1000, mask=None):
+        self.all_features = list(features)
+        self.channels = dict(channels)
+        self.fs = fs
+        if mask is None:
+            mask = np.ones(len(self.all_features), dtype=bool)
+        mask = np.asarray(mask, dtype=bool)
+        if len(mask) != len(self.all_features):
+            raise ValueError(
+                f"Feature mask has {len(mask)} entries, expected {len(self.all_features)}"
+            )
+        self.mask = mask
+        self.features = [f for f, keep in zip(self.all_features, mask) if keep]
+
+    @property
+    def names(self):
+        return [f"{name}_{'_'.join(chs)}" for name, chs in self.features]
+
+    @property
+    def version(self):
+        """Hash of the selected features, channel conversions, fs and FEATURE_SET_VERSION."""
+        spec = repr((FEATURE_SET_VERSION, self.features, sorted(self.channels.items()), self.fs))
+        return hashlib.sha1(spec.encode()).hexdigest()[:12]
+
+    def cost(self, features=None):
+        """Relative cost: features plus the steps they need (once per channel)."""
+        features = self.features if features is None else features
+        steps = set()
+        total = 0
+        for name, chs in features:
+            feature = FEATURES[name]
+            total += feature.cost
+            steps |= {(ch, step) for ch in chs for step in _step_closure(feature.deps)}
+        return total + sum(STEPS[step].cost for _, step in steps)
+
+    def describe(self):
+        return (
+            f"{len(self.features)}/{len(self.all_features)} features, "
+            f"cost {self.cost()} of {self.cost(self.all_features)}"
+        )
+
+    def convert(self, raw):
+        """{channel: raw codes} -> {channel: physical units} (the conversion of extract())."""
+        out = {}
+        for ch, signal in raw.items():
+            sensor, unit = self.channels[ch]
+            out[ch] = to_phy(sensor, np.asarray(signal), unit)
+        return out
+
+    def extract(self, raw, converted=False):
+        """
+        raw: {channel: samples (n,) or windows (W, n)} -> (n_features,) or
+        (W, n_features). converted=True if raw is already in physical units.
+        """
+        contexts = {}
+        values = []
+        for name, chs in self.features:
+            for ch in chs:
+                if ch not in contexts:
+                    sensor, unit = self.channels[ch]
+                    contexts[ch] = _Context(
+                        np.asarray(raw[ch]), sensor, unit, self.fs, converted
+                    )
+            values.append(FEATURES[name].func(*(contexts[ch] for ch in chs)))
+        return np.stack(values, axis=-1).astype(float)
+
+    def extract_windows(self, raw, window, step, batch=2048):
+        """
+        extract() for every window starting at range(0, n - window, step).
+
+        Each channel is converted once; windows are strided views processed
+        `batch` at a time.
+        """
+        converted = self.convert(raw)
+        n = len(next(iter(converted.values())))
+        starts = np.arange(0, n - window, step)
+        out = np.zeros((len(starts), len(self.features)))
+        if not len(starts):
+            return out
+        views = {
+            ch: sliding_window_view(x, window)[::step][: len(starts)]
+            for ch, x in converted.items()
+        }
+        for b in range(0, len(starts), batch):
+            windows = {ch: v[b : b + batch] for ch, v in views.items()}
+            out[b : b + batch] = self.extract(windows, converted=True)
+        return out
+
+
+# --------------------------
+# Feature sets
+# --------------------------
+EMG_PER_CHANNEL = [
+    "std",
+    "max",
+    "zcr",
+    "std_abs",
+    "wl",
+    "wamp",
+    "spectral_centroid",
+    "spectral_entropy",
+]
+
+# feature_utils.extract_emg_features / model_2 MLP (17 features)
+EMG_CHANNELS = {"flexor": ("EMG", "mV"), "extensor": ("EMG", "mV")}
+EMG_FEATURES = (
+    [(name, ("flexor",)) for name in EMG_PER_CHANNEL]
+    + [(name, ("extensor",)) for name in EMG_PER_CHANNEL]
+    + [("std_ratio", ("flexor", "extensor"))]
+)
+
+# rock_paper_scissor.ipynb / live_classification.py KNN (21 features before RFE)
+KNN_EMG_PER_CHANNEL = [
+    "zcr_product" if name == "zcr" else name for name in EMG_PER_CHANNEL
+]
+KNN_CHANNELS = {"CH2": ("EMG", "mV"), "CH4": ("EMG", "mV"), "CH3": ("ACC", "g")}
+KNN_FEATURES = (
+    [(name, ("CH2",)) for name in KNN_EMG_PER_CHANNEL]
+    + [(name, ("CH4",)) for name in KNN_EMG_PER_CHANNEL]
+    + [(name, ("CH3",)) for name in ["mean", "std", "max", "zcr_product", "slope"]]
+)
@@ -1,48 +1,156 @@
 import numpy as np
-from scipy.signal import welch
-from scipy.stats import entropy
-import biosignalsnotebooks as bsnb
-from sklearn.preprocessing import StandardScaler
 
+from conversion import to_phy
+from feature_registry import EMG_CHANNELS, EMG_FEATURES, FeatureExtractor
+from ring_buffer import RingBuffer
+from spectral_engine import centroid_entropy, get_engine
 
-def spectral(sig, fs=1000):
-    f, Pxx = welch(sig, fs=fs)
-    if np.sum(Pxx) == 0:
-        return 0.0, 0.0
-    Pxx /= np.sum(Pxx)
-    return np.sum(f * Pxx), entropy(Pxx)
+_extractors = {}
+
+
+def _emg_extractor(fs):
+    if fs not in _extractors:
+        _extractors[fs] = FeatureExtractor(EMG_FEATURES, EMG_CHANNELS, fs)
+    return _extractors[fs]
 
 
 def extract_emg_features(segment, fs=1000):
     """Extract 17 EMG features (8 per channel + ratio)."""
-    ch_flex = bsnb.raw_to_phy("EMG", "biosignalsplux", segment[:, 0], 16, "mV")
-    ch_ext = bsnb.raw_to_phy("EMG", "biosignalsplux", segment[:, 1], 16, "mV")
-
-    def feats(x):
-        sc, se = spectral(x, fs)
-        return [
-            np.std(x),
-            np.max(x),
-            np.sum(np.diff(np.sign(x)) != 0) / len(x),
-            np.std(np.abs(x)),
-            np.sum(np.abs(np.diff(x))),
-            np.sum(np.abs(np.diff(x)) > 0.02),
-            sc,
-            se,
-        ]
-
-    f1, f2 = feats(ch_flex), feats(ch_ext)
-    ratio = (np.std(ch_flex) + 1e-6) / (np.std(ch_ext) + 1e-6)
-    features = np.concatenate([f1, f2, [ratio]])
-
-    return features
-
-
-def extract_emg_ratio(segment, fs=1000):
-    """Extract 17MG ratio."""
-    ch_flex = bsnb.raw_to_phy("EMG", "biosignalsplux", segment[:, 0], 16, "mV")
-    ch_ext = bsnb.raw_to_phy("EMG", "biosignalsplux", segment[:, 1], 16, "mV")
-
-    ratio = (np.std(ch_flex) + 1e-6) / (np.std(ch_ext) + 1e-6)
-    
-    return ratio
+    return _emg_extractor(fs).extract({"flexor": segment[:, 0], "extensor": segment[:, 1]})
+
+
+def window_starts(n, window, step):
+    """Window start indices used for training: range(0, n - window, step)."""
+    return np.arange(0, n - window, step)
+
+
+def extract_emg_features_batch(signal, window, step, fs=1000, batch=2048):
+    """
+    extract_emg_features() for every sliding window of a (n, 2) raw recording.
+
+    Windows start at window_starts(len(signal), window, step); returns an
+    array of shape (n_windows, 17), equal to calling extract_emg_features()
+    on each window. The signal is converted once and the windows are strided
+    views, processed `batch` windows at a time to bound memory.
+    """
+    signal = np.asarray(signal)
+    return _emg_extractor(fs).extract_windows(
+        {"flexor": signal[:, 0], "extensor": signal[:, 1]}, window, step, batch
+    )
+
+
+class _WindowSums:
+    """Running column sums over the newest `width` rows of a stream."""
+
+    def __init__(self, width, n_cols):
+        self.width = width
+        self.rows = RingBuffer(width, n_cols)
+        self.sums = np.zeros(n_cols)
+
+    def push(self, rows):
+        if len(rows) >= self.width:
+            self.rows.extend(rows)
+            self.resync()
+            return
+        n_out = len(self.rows) + len(rows) - self.width
+        if n_out > 0:
+            self.sums -= self.rows.latest()[:n_out].sum(axis=0)
+        self.sums += rows.sum(axis=0)
+        self.rows.extend(rows)
+
+    def resync(self):
+        self.sums = self.rows.latest().sum(axis=0)
+
+
+class StreamingEMGFeatures:
+    """
+    extract_emg_features() over a sliding window, updated chunk by chunk.
+
+    push() costs O(chunk): sums of x, x^2 and |x| (std, std of abs) and of
+    |dx|, |dx| > 0.02 and sign changes (waveform length, WAMP, zero
+    crossings) are updated with the samples entering and leaving the window.
+    The max is taken on the window view and both channels' spectra come
+    from one SpectralEngine call (welch(nperseg=256) only looks at the first
+    384 of 500 samples anyway).
+    Float sums are recomputed from the window every `resync_every` pushes so
+    rounding does not accumulate; features() matches extract_emg_features()
+    to ~1e-8 (relative). With a `mask` over the 17 features only the
+    selected ones are returned, like a masked FeatureExtractor.
+    """
+
+    WAMP_THRESHOLD = 0.02
+
+    def __init__(self, window=500, fs=1000, resync_every=200, mask=None):
+        self.window = window
+        self.fs = fs
+        self.resync_every = resync_every
+        self.mask = None if mask is None else np.asarray(mask, dtype=bool)
+        self._engine = get_engine(fs)
+        self.reset()
+
+    def reset(self):
+        """Forget all samples (e.g. after a gap in the stream)."""
+        self.values = RingBuffer(self.window, 2)
+        self.sample_sums = _WindowSums(self.window, 6)  # x, x^2, |x| per channel
+        self.pair_sums = _WindowSums(self.window - 1, 6)  # |dx|, |dx| > thr, sign change
+        self._last = None
+        self._pushes = 0
+
+    @property
+    def ready(self) -> bool:
+        return len(self.values) >= self.window
+
+    def push(self, raw):
+        """Add a (n, 2) chunk of raw flexor/extensor samples."""
+        raw = np.asarray(raw)
+        if not len(raw):
+            return
+        x = to_phy("EMG", raw, "mV")
+        self.sample_sums.push(np.hstack([x, x * x, np.abs(x)]))
+
+        prev = x if self._last is None else np.vstack([self._last, x])
+        if len(prev) > 1:
+            dx = np.diff(prev, axis=0)
+            crossings = np.diff(np.sign(prev), axis=0) != 0
+            self.pair_sums.push(
+                np.hstack([np.abs(dx), np.abs(dx) > self.WAMP_THRESHOLD, crossings])
+            )
+        self._last = x[-1:]
+        self.values.extend(x)
+
+        self._pushes += 1
+        if self._pushes % self.resync_every == 0:
+            self.sample_sums.resync()
+            self.pair_sums.resync()
+
+    def features(self):
+        """The 17 features of the current window (same order as extract_emg_features)."""
+        n = len(self.values)
+        window = self.values.latest()
+        s1, s2, a1 = self.sample_sums.sums.reshape(3, 2) / n
+        wl, wamp, zc = self.pair_sums.sums.reshape(3, 2)
+        std = np.sqrt(np.maximum(s2 - s1 * s1, 0.0))
+        std_abs = np.sqrt(np.maximum(s2 - a1 * a1, 0.0))
+        peak = window.max(axis=0)
+
+        sc, se = centroid_entropy(*self._engine.psd(window.T))
+
+        feats = []
+        for c in range(2):
+            feats += [std[c], peak[c], zc[c] / n, std_abs[c], wl[c], wamp[c], sc[c], se[c]]
+        ratio = (std[0] + 1e-6) / (std[1] + 1e-6)
+        feats = np.array(feats + [ratio])
+        return feats if self.mask is None else feats[self.mask]
+
+
+def streaming_emg(extractor, window):
+    """
+    StreamingEMGFeatures that computes the same as `extractor`, or None if the
+    extractor is not (a masked) EMG_FEATURES / EMG_CHANNELS set. Its push()
+    takes (n, 2) raw samples of the "flexor" and "extensor" channels.
+    """
+    emg = _emg_extractor(extractor.fs)
+    if extractor.all_features != emg.all_features or extractor.channels != emg.channels:
+        return None
+    return StreamingEMGFeatures(window, extractor.fs, mask=extractor.mask)
+
@@ -4,6 +4,7 @@ from typing import Tuple, Optional
 import math, random, sys
 import pygame as pg
 from game_input import KeyboardInput, EMGInput, SmoothedInput, EEGBlinkInput
+from latency_trace import tracer_from_env
 import threading
 import numpy as np
 from pyqtgraph.Qt import QtCore, QtWidgets
@@ -149,6 +150,10 @@ def main(eeg_input=None, screen=None):
     input_src = (
         kb if MODE == 0 else SmoothedInput(emg) if MODE == 1 else eeg
     )
+    # Blink -> flap latency (ms since dev.read()); BITALINO_TRACE=<folder> dumps it on exit
+    tracer = tracer_from_env(["convert", "detect", "flap", "display"], "flappybird")
+    traced_blink = None
+    flap_read_time = None
     bird = pg.Rect(BIRD_X, HEIGHT // 2, 56, 40)
     vel_y = 0.0
 
@@ -190,6 +195,7 @@ def main(eeg_input=None, screen=None):
                 vel_y = FLAP_VEL
                 cartoon_jump.play()
                 started = True
+                input_src.annotate("flap")
 
         if MODE == 2:
             blink = eeg.read()
@@ -197,6 +203,13 @@ def main(eeg_input=None, screen=None):
                 vel_y = FLAP_VEL
                 cartoon_jump.play()
                 started = True
+                input_src.annotate("flap")
+                stamps = eeg.blink_stamps
+                if stamps is not None and stamps is not traced_blink:
+                    traced_blink = stamps
+                    flap_read_time = stamps[0]
+                    tracer.record(*stamps)
+                    tracer.mark("flap", flap_read_time)
             update_plot()  # adjust scaling
 
         if started:
@@ -217,6 +230,7 @@ def main(eeg_input=None, screen=None):
             if pipes[i].right < BIRD_X <= pipes[i].right + PIPE_SPEED:
                 score += 1
                 point_smooth_beep.play()
+                input_src.annotate(f"score {score}")
 
         # Remove off-screen pipes
         pipes = [p for p in pipes if p.right > 0]
@@ -225,6 +239,7 @@ def main(eeg_input=None, screen=None):
         if collide(bird, pipes):
             # Reset
             uh.play()
+            input_src.annotate("crash")
             bird = pg.Rect(BIRD_X, HEIGHT // 2, 56, 40)
             vel_y = 0.0
             pipes = []
@@ -249,8 +264,17 @@ def main(eeg_input=None, screen=None):
         draw_text(screen, f"Mode: {mode_names[MODE]}  Score: {score}", 40, WIDTH // 2, 20)
         if MODE == 1:
             draw_text(screen, f"Flex:{flex:.2f} Ext:{ext:.2f}  (M to toggle)", 36, WIDTH // 2, 72, (180, 180, 200))
+        if MODE == 2:
+            draw_text(screen, f"Dropped samples: {eeg.integrity.dropped}", 24, WIDTH // 2, 72, (180, 180, 200))
+            if tracer.counts["display"]:
+                for i, line in enumerate(tracer.lines()):
+                    draw_text(screen, line, 18, WIDTH // 2, HEIGHT - 120 + 22 * i, (140, 140, 160))
 
         pg.display.flip()
+        if flap_read_time is not None:
+            tracer.mark("display", flap_read_time)
+            flap_read_time = None
+    tracer.close()
     pg.quit()
     sys.exit()
 
@@ -313,8 +337,8 @@ if __name__ == "__main__":
         if eeg_ref is None:
             return
         with eeg_ref.buffer_lock:
-            data = eeg_ref.live_plot_buffer.copy()
-            offset = (eeg_ref.total_samples - len(data)) / EEG_FS
+            data = eeg_ref.live_plot_buffer.latest()[:, 0].copy()
+            offset = (eeg_ref.live_plot_buffer.total - len(data)) / EEG_FS
         if data.size == 0:
             return
         t = offset + np.arange(len(data)) / EEG_FS
@@ -1,10 +1,16 @@
-from typing import Tuple
+from typing import NamedTuple, Tuple
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from bitalino import BITalino
+from device_source import open_device
 from scipy.signal import butter, lfilter
+import threading
 import time
-import threading, time
-from collections import deque
+
+from acquisition import SequenceTracker
+from conversion import adc_to_microvolt
+from recorder import recorder_from_env
+from ring_buffer import RingBuffer
 
 
 # ====== CONFIG ======
@@ -16,6 +22,7 @@ EEG_GAIN = 41780.0
 THRESHOLD_UV_LOW = 35
 N_SAMPLES = 50
 EEG_PLOT_LENGTH = 3 * EEG_FS
+READ_WORKERS = 32  # read threads; reads of further stream()s queue for a free one
 # =====================
 
 
@@ -25,6 +32,108 @@ class InputSource:
         """Return (flex, ext) in [0,1]. Override in subclasses."""
         return 0.0
 
+    def annotate(self, label: str):
+        """Mark a game event in the session recording (if one is running)."""
+        pass
+
+
+class Chunk(NamedTuple):
+    """One device read delivered by DeviceInput.stream()."""
+
+    t: float  # time.time() when the read returned
+    end: int  # device frames up to this chunk, lost frames included
+    samples: np.ndarray  # raw dev.read() result
+    value: float  # source output after this chunk (ratio / blink)
+
+
+_read_executor = None
+
+
+def _get_read_executor():
+    global _read_executor
+    if _read_executor is None:
+        _read_executor = ThreadPoolExecutor(
+            max_workers=READ_WORKERS, thread_name_prefix="bitalino-read"
+        )
+    return _read_executor
+
+
+class DeviceInput(InputSource):
+    """
+    Base for inputs backed by a BITalino.
+
+    With threaded=True (default) a daemon thread keeps read() up to date, as
+    the games expect. With threaded=False nothing runs in the background and
+    the chunks are consumed from an event loop instead:
+
+        async for chunk in EEGBlinkInput(threaded=False).stream():
+            ...
+
+    Many sources can share one loop, but the reads are still thread per
+    stream: dev.read() blocks, so every running stream() keeps a thread of a
+    shared pool (READ_WORKERS) busy in it. With more streams than threads the
+    extra reads queue until a thread is free, which delays their chunks.
+    """
+
+    thread = None
+    recorder = None
+    read_time = None  # perf_counter() when the last dev.read() returned (latency_trace)
+
+    def _start_reader(self, threaded):
+        if threaded:
+            self.thread = threading.Thread(target=self._reader, daemon=True)
+            self.thread.start()
+
+    def _process(self, samples) -> float:
+        """Handle one dev.read() result and return the new output value."""
+        raise NotImplementedError
+
+    async def stream(self, max_pending=4):
+        """
+        Yield a Chunk per dev.read() until the source ends or is cancelled.
+
+        At most `max_pending` chunks are buffered: a slow consumer stops the
+        reads, the device then buffers on its side and anything it drops shows
+        up in `integrity`. Breaking out of the loop or cancelling the task
+        stops the reads; a read already in flight finishes in the pool and
+        its chunk is discarded.
+        """
+        if self.thread is not None and self.thread.is_alive():
+            raise RuntimeError("stream() needs a source created with threaded=False")
+        loop = asyncio.get_running_loop()
+        pending = asyncio.Queue(maxsize=max_pending)
+
+        async def produce():
+            try:
+                while True:
+                    samples = await loop.run_in_executor(
+                        _get_read_executor(), self.dev.read, self.n_samples
+                    )
+                    self.read_time = time.perf_counter()
+                    value = self._process(samples)
+                    end = self.integrity.frames + self.integrity.dropped
+                    await pending.put(Chunk(time.time(), end, samples, value))
+            except EOFError:
+                await pending.put(None)
+            except Exception as e:
+                await pending.put(e)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                item = await pending.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            producer.cancel()
+
+    def annotate(self, label: str):
+        if self.recorder:
+            self.recorder.annotate(label)
+
 
 class KeyboardInput(InputSource):
     """Keyboard input mapped to pseudo-EMG (using pygame)."""
@@ -38,13 +147,18 @@ class KeyboardInput(InputSource):
         return ratio
 
 
-class EMGInput(InputSource):
+class EMGInput(DeviceInput):
     """Non-blocking EMG input using a background thread that outputs ratio."""
 
     def __init__(
-        self, mac="98:D3:11:FE:02:74", fs=1000, channels=(1, 3), n_samples=100
+        self,
+        mac="98:D3:11:FE:02:74",
+        fs=1000,
+        channels=(1, 3),
+        n_samples=100,
+        threaded=True,
     ):
-        self.dev = BITalino(mac)
+        self.dev = open_device(mac)
         self.dev.start(fs, list(channels))
         self.fs = fs
         self.channels = channels
@@ -54,33 +168,41 @@ class EMGInput(InputSource):
         self.ext = 0.0
         self.boost_ext = 1  # Factor to boost extensor stddev when above threshold
         self.boost_ext_threshold = 1.00  # Threshold for extensor stddev to apply boost
+        self.integrity = SequenceTracker()  # lost frames from nSeq, shown in the HUD
+        self.recorder = recorder_from_env(fs, channels, name="emg_game")
 
-        self.thread = threading.Thread(target=self._reader, daemon=True)
-        self.thread.start()
+        self._start_reader(threaded)
         print(f"✅ Async EMGInput running on channels {channels} @ {fs} Hz")
 
-    def _reader(self):
-        while self._running:
-            try:
-                samples = self.dev.read(self.n_samples)
-                raw = samples[:, 5:].astype(float)
-                flex = raw[:, 0]
-                ext = raw[:, 1]
+    def _process(self, samples) -> float:
+        if self.recorder:
+            self.recorder.write(samples)
+        self.integrity.update(samples[:, 0])
+        raw = samples[:, 5:].astype(float)
+        flex = raw[:, 0]
+        ext = raw[:, 1]
 
-                flex_mv = (flex / (2**16 - 1)) * 3.3
-                ext_mv = (ext / (2**16 - 1)) * 3.3
+        flex_mv = (flex / (2**16 - 1)) * 3.3
+        ext_mv = (ext / (2**16 - 1)) * 3.3
 
-                flex_std = np.std(flex_mv)
-                self.ext = np.std(ext_mv)
-                # print(f"🔍 flex_std: {flex_std:.4f} mV, ext_std: {self.ext:.4f} mV")
+        flex_std = np.std(flex_mv)
+        self.ext = np.std(ext_mv)
+        # print(f"🔍 flex_std: {flex_std:.4f} mV, ext_std: {self.ext:.4f} mV")
 
-                # Increase ext_std further if it is significantly large
-                if self.ext > self.boost_ext_threshold:
-                    self.ext *= self.boost_ext  # Scale factor can be adjusted
-                    # print(f"🔧 Boosted ext_std to {self.ext:.4f} mV")
+        # Increase ext_std further if it is significantly large
+        if self.ext > self.boost_ext_threshold:
+            self.ext *= self.boost_ext  # Scale factor can be adjusted
+            # print(f"🔧 Boosted ext_std to {self.ext:.4f} mV")
 
-                self.ratio = (flex_std + 1e-6) / (self.ext + 1e-6)
+        self.ratio = (flex_std + 1e-6) / (self.ext + 1e-6)
+        return self.ratio
 
+    def _reader(self):
+        while self._running:
+            try:
+                samples = self.dev.read(self.n_samples)
+                self.read_time = time.perf_counter()
+                self._process(samples)
             except Exception as e:
                 print("⚠️ EMG read error:", e)
                 time.sleep(0.05)
@@ -99,6 +221,8 @@ class EMGInput(InputSource):
             print("🧠 BITalino device closed.")
         except Exception as e:
             print("⚠️ Error closing BITalino:", e)
+        if self.recorder:
+            self.recorder.close()
 
 
 class SmoothedInput(InputSource):
@@ -137,37 +261,49 @@ class SmoothedInput(InputSource):
         # print(f"SmoothedInput: raw={ratio:.3f}, smoothed={self.ratio:.3f}")
         return self.ratio
 
+    def annotate(self, label: str):
+        self.src.annotate(label)
+
 
 # ====== EEG Blink Detector ======
-class EEGBlinkInput(InputSource):
+class EEGBlinkInput(DeviceInput):
     """
     Reads EEG signal from BITalino and detects blinks.
     Output: (blink_detected, 0.0)
     """
 
-    def __init__(self, mac=EEG_MAC, channel=EEG_CHANNEL, threshold_uv=THRESHOLD_UV_LOW):
-        self.dev = BITalino(mac)
+    n_samples = N_SAMPLES
+
+    def __init__(
+        self,
+        mac=EEG_MAC,
+        channel=EEG_CHANNEL,
+        threshold_uv=THRESHOLD_UV_LOW,
+        threaded=True,
+    ):
+        self.dev = open_device(mac)
         self.dev.start(EEG_FS, [channel])
         self.channel = channel
         self.buffer = np.zeros(0)
-        self.live_plot_buffer = np.zeros(0)  # For visualization
+        self.live_plot_buffer = RingBuffer(EEG_PLOT_LENGTH)  # For visualization
         self.buffer_lock = threading.Lock()
         self.threshold = threshold_uv  # µV threshold, same as reaction.py
         self.last_blink_time = 0.0
         self.min_blink_interval = 0.09  # seconds to ignore double detections
         self.blink_detected = 0.0
+        # (read time, {stage: perf_counter()}) of the last blink, for latency_trace
+        self.blink_stamps = None
         self._running = True
         self.downsample_blink_detection = 0
-        self.total_samples = 0
+        self.integrity = SequenceTracker()  # lost frames from nSeq, shown in the HUD
+        self.recorder = recorder_from_env(EEG_FS, [channel], name="eeg_game")
 
-        self.thread = threading.Thread(target=self._reader, daemon=True)
-        self.thread.start()
+        self._start_reader(threaded)
         print(f"✅ Async EEGInput running on channels {self.channel} @ {EEG_FS} Hz")
 
     # --- conversion helpers ---
     def adc_to_microvolt(self, adc):
-        eeg_v = ((adc / (2**16 - 1)) - 0.5) * (EEG_VCC / EEG_GAIN)
-        return eeg_v * 1e6
+        return adc_to_microvolt(adc, EEG_VCC, EEG_GAIN)
 
     def bandpass_filter(self, data, lowcut=1.0, highcut=15.0, order=2):
         b, a = butter(
@@ -176,43 +312,49 @@ class EEGBlinkInput(InputSource):
         return lfilter(b, a, data)
 
     # --- main read ---
+    def _process(self, samples) -> float:
+        if self.recorder:
+            self.recorder.write(samples)
+        self.integrity.update(samples[:, 0])
+        raw = samples[:, 5 + self.channel].astype(float)
+        microvolt = self.adc_to_microvolt(raw)
+        microvolt = abs(microvolt)
+        t_convert = time.perf_counter()
+        with self.buffer_lock:
+            self.live_plot_buffer.extend(microvolt)
+
+        # preprocess
+        # filt = self.bandpass_filter(microvolt)
+        max_amplitude = np.min(microvolt)
+        # print(f"🔍 EEG max_amplitude: {max_amplitude:.1f} µV")
+        # print(f"🔍 EEG max_amplitude: {max_amplitude:.1f} µV")
+        # --- blink detection logic ---
+        self.blink_detected = 0.0
+        self.downsample_blink_detection += 1
+        if self.downsample_blink_detection > 0:
+            if np.min(microvolt) < THRESHOLD_UV_LOW:
+                print(f"⚡ Blink detected, min uv: {np.min(microvolt)}")
+                self.downsample_blink_detection = 0
+                self.blink_detected = 1.0
+                self.blink_stamps = (
+                    self.read_time,
+                    {"convert": t_convert, "detect": time.perf_counter()},
+                )
+
+        # now = time.time()
+        # if (
+        #     max_amplitude < self.threshold
+        #     and (now - self.last_blink_time) > self.min_blink_interval
+        # ):
+        # self.last_blink_time = now
+        return self.blink_detected
+
     def _reader(self) -> float:
         while self._running:
             try:
                 samples = self.dev.read(N_SAMPLES)
-                raw = samples[:, 5 + self.channel].astype(float)
-                microvolt = self.adc_to_microvolt(raw)
-                microvolt = abs(microvolt)
-                num_new = len(microvolt)
-                self.total_samples += num_new
-                with self.buffer_lock:
-                    self.live_plot_buffer = np.concatenate([self.live_plot_buffer, microvolt])
-                    size = self.live_plot_buffer.size
-                    # print(f"Live plot buffer size: {size}")
-                    if self.live_plot_buffer.size > EEG_PLOT_LENGTH:
-                        self.live_plot_buffer = self.live_plot_buffer[-EEG_PLOT_LENGTH:]
-
-                # preprocess
-                # filt = self.bandpass_filter(microvolt)
-                max_amplitude = np.min(microvolt)
-                # print(f"🔍 EEG max_amplitude: {max_amplitude:.1f} µV")
-                # print(f"🔍 EEG max_amplitude: {max_amplitude:.1f} µV")
-                # --- blink detection logic ---
-                self.blink_detected = 0.0
-                self.downsample_blink_detection += 1
-                if self.downsample_blink_detection > 0:
-                    if np.min(microvolt) < THRESHOLD_UV_LOW:
-                        print(f"⚡ Blink detected, min uv: {np.min(microvolt)}")
-                        self.downsample_blink_detection = 0
-                        self.blink_detected = 1.0
-
-                # now = time.time()
-                # if (
-                #     max_amplitude < self.threshold
-                #     and (now - self.last_blink_time) > self.min_blink_interval
-                # ):
-                # self.last_blink_time = now
-
+                self.read_time = time.perf_counter()
+                self._process(samples)
             except Exception as e:
                 print(f"⚠️ Error reading BITalino: {e}")
                 return 0.0
@@ -229,3 +371,5 @@ class EEGBlinkInput(InputSource):
             print("🧠 BITalino EEG device closed.")
         except Exception as e:
             print(f"⚠️ Error closing BITalino: {e}")
+        if self.recorder:
+            self.recorder.close()
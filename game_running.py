@@ -248,6 +248,8 @@ def main():
         dt = clock.tick(FPS)
         for event in pg.event.get():
             if event.type == pg.QUIT:
+                if real is not None:
+                    real.close()  # also finishes the session recording
                 pg.quit()
                 sys.exit()
             elif event.type == pg.KEYDOWN:
@@ -318,10 +320,12 @@ def main():
                 on_ground = False
                 jumps_remaining -= 1
                 cartoon_jump.play()
+                input_src.annotate("jump")
 
         # --- Ducking (only when grounded) ---
         if request_duck and on_ground and not ducking:
             hitting_sandbag.play()
+            input_src.annotate("duck")
         ducking = bool(request_duck and on_ground)
         current_h = int(player_h * player_scale * (DUCK_SCALE if ducking else 1.0))
         player.height = current_h
@@ -405,6 +409,7 @@ def main():
                             ob.hit = True
                             random.choice(hit_sounds).play()
                             player_lives -= 1  # Decrement lives on collision
+                            input_src.annotate("hit")
                             hit_cooldown = 500  # Set cooldown to 500ms
                             consecutive_obstacles = 0
                             level_up_trigger = False
@@ -418,6 +423,7 @@ def main():
                                 alive = False
                                 random.choice(fail_sounds).play()
                                 death_time = pg.time.get_ticks()
+                                input_src.annotate("game over")
                             break
         else:
             # Auto-restart after 1.5 seconds
@@ -592,6 +598,15 @@ def main():
         draw_text(
             screen, f"Jumps Left: {jumps_remaining}", 20, 10, 130, (200, 200, 200)
         )
+        if real is not None:
+            draw_text(
+                screen,
+                f"Dropped samples: {real.integrity.dropped}",
+                18,
+                WIDTH - 250,
+                30,
+                (200, 200, 200),
+            )
         # Display player lives on the screen
         lives_color = (
             (0, 255, 0)
@@ -0,0 +1,101 @@
+"""
+Temporal decoding of per-window class probabilities.
+
+A majority vote over the last N predictions waits for half the window
+count before it flips and ignores how confident each prediction was.
+GestureDecoder runs an HMM forward filter instead: the hidden gesture
+stays the same from one window to the next with probability
+1 - switch_prob, the model's predict_proba output is the evidence, and the
+shown gesture changes once another gesture's posterior passes `enter`.
+Each update is O(n_classes).
+
+    decoder = GestureDecoder(len(gesture_names), **DECODER_PRESETS["balanced"])
+    for proba in stream:
+        gesture = gesture_names[decoder.update(proba)]
+
+switch_prob, enter and min_windows trade latency for stability. After 20
+relax windows at 0.97 (0.03 on rock), windows at 0.95 for rock (0.05 on
+relax) flip the shown gesture on the second window with "fast" and
+"balanced" and on the fourth with "stable"; none of them follows a single
+rock window. If the model spreads the remainder over all four classes
+instead, "fast" flips on the first window and "stable" on the third.
+"""
+
+import numpy as np
+
+DECODER_PRESETS = {
+    "fast": {"switch_prob": 0.2, "enter": 0.6, "min_windows": 1},
+    "balanced": {"switch_prob": 0.1, "enter": 0.75, "min_windows": 1},
+    "stable": {"switch_prob": 0.02, "enter": 0.9, "min_windows": 2},
+}
+
+
+class GestureDecoder:
+    """
+    Forward filter with a sticky transition model and hysteresis on its posterior.
+
+    n_classes: number of classes (columns of predict_proba)
+    switch_prob: probability that the gesture changes between two windows
+    enter: posterior a new gesture needs before it is shown
+    min_windows: consecutive windows the new gesture must pass `enter`
+    floor: lower bound of the per-class evidence, so a single 0.0 from the
+    model cannot rule a gesture out for good
+    prior: class frequencies of the training data; the evidence is divided
+    by it (default: uniform)
+    """
+
+    def __init__(
+        self,
+        n_classes,
+        switch_prob=0.1,
+        enter=0.75,
+        min_windows=1,
+        floor=1e-3,
+        prior=None,
+        initial=0,
+    ):
+        if not 0 < switch_prob < 1:
+            raise ValueError("switch_prob must be in (0, 1)")
+        self.n_classes = n_classes
+        self.switch_prob = switch_prob
+        self.enter = enter
+        self.min_windows = min_windows
+        self.floor = floor
+        self.prior = None if prior is None else np.asarray(prior, dtype=float)
+        self.initial = initial
+        self.reset()
+
+    def reset(self):
+        self.posterior = np.full(self.n_classes, 1.0 / self.n_classes)
+        self.state = self.initial
+        self.candidate = None
+        self.streak = 0
+
+    def update(self, proba):
+        """Add the class probabilities of one window; returns the shown class index."""
+        # Predict: stay with 1 - switch_prob, otherwise any class uniformly
+        post = self.posterior * (1 - self.switch_prob)
+        post += self.switch_prob / self.n_classes
+        # Update with the model's evidence
+        evidence = np.maximum(np.asarray(proba, dtype=float), self.floor)
+        if self.prior is not None:
+            evidence /= self.prior
+        post *= evidence
+        post /= post.sum()
+        self.posterior = post
+
+        best = int(np.argmax(post))
+        if best == self.state or post[best] < self.enter:
+            self.candidate, self.streak = None, 0
+            return self.state
+        if best != self.candidate:
+            self.candidate, self.streak = best, 0
+        self.streak += 1
+        if self.streak >= self.min_windows:
+            self.state, self.candidate, self.streak = best, None, 0
+        return self.state
+
+    @property
+    def confidence(self):
+        """Posterior of the shown class."""
+        return float(self.posterior[self.state])
@@ -0,0 +1,292 @@
+"""
+Classification in a separate process, fed through shared memory.
+
+The GUI process keeps the sample buffer in a shared_stream.SharedRing
+(the same shared-memory layout the acquisition daemon publishes) and hands
+it to its AcquisitionThread as usual. An InferenceWorker process forked
+from it reads the same block, and every `hop` new samples it updates the
+features of the newest bundle.window samples (WindowClassifier:
+incrementally for the EMG feature set), runs the model and puts a
+Prediction on a queue. The GUI only drains results():
+
+    ring = SharedRing.create(capacity, n_channels, dtype=float)
+    worker = InferenceWorker(
+        "model_2/emg_mlp.bundle", ring, {"flexor": 0, "extensor": 1}, hop=50,
+        spec=(EMG_FEATURES, EMG_CHANNELS),
+    )
+    worker.start()  # before the QApplication / device threads, see below
+    ...
+    for p in worker.results():
+        label.setText(bundle.class_names[p.label])
+
+Each Prediction carries the sample counter of its window end, the host
+time at which the worker saw that sample, and the worker's own processing
+latency. stats_text() adds the queue delay measured on receipt. If the
+worker falls behind it jumps to the newest window and counts the skipped
+ones.
+
+The worker is forked where possible: the live scripts run at module level
+without a __main__ guard, so a spawned process would re-run the whole GUI
+script. Start it before the QApplication and the acquisition thread exist.
+Without fork it runs in a thread of the GUI process instead.
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque
+from typing import NamedTuple
+
+import numpy as np
+
+from shared_stream import SharedRing
+
+class Prediction(NamedTuple):
+    end: int  # buffer sample counter at the end of the classified window
+    t: float  # host time (time.time()) when the worker saw that sample
+    label: int  # predicted class (bundle.model.classes)
+    proba: np.ndarray  # class probabilities
+    features: np.ndarray  # model input (normalised features)
+    raw: np.ndarray  # the same features before normalisation
+    latency: float  # seconds from seeing the window to the result (worker side)
+    stamps: dict  # perf_counter() after each stage: seen, convert, features, scale, predict
+
+
+def classify(bundle, extractor, raw, stamps=None):
+    """
+    One window through the live path: conversion, features, normalisation and
+    model. raw: {extractor channel: raw codes}. Returns (label, proba, x,
+    feats) with x the normalised feats; with a `stamps` dict, the perf_counter() after each stage is stored in it.
+    """
+    if stamps is None:
+        stamps = {}
+    signals = extractor.convert(raw)
+    stamps["convert"] = time.perf_counter()
+    feats = extractor.extract(signals, converted=True)
+    stamps["features"] = time.perf_counter()
+    return _predict(bundle, feats, stamps)
+
+
+def _predict(bundle, feats, stamps):
+    x = bundle.normalize(feats)
+    stamps["scale"] = time.perf_counter()
+    proba = bundle.predict_proba_one(x, normalized=True)
+    label = bundle.model.classes[int(np.argmax(proba))]
+    stamps["predict"] = time.perf_counter()
+    return int(label), proba, x, feats
+
+
+class WindowClassifier:
+    """
+    classify() for the window ending at a ring sample counter, one call per hop.
+
+    For the EMG feature set (feature_utils.streaming_emg) only the samples
+    written since the previous call are converted and folded into running
+    sums, so a hop costs O(hop) plus the max and the spectrum of the window;
+    any other feature set is recomputed on the whole window. columns:
+    {extractor channel: ring column}.
+    """
+
+    def __init__(self, bundle, extractor, columns):
+        from feature_utils import streaming_emg
+
+        self.bundle = bundle
+        self.extractor = extractor
+        self.columns = dict(columns)
+        self.stream = streaming_emg(extractor, bundle.window)
+        self.end = None  # ring counter up to which the stream has been fed
+
+    def __call__(self, ring, end, stamps=None):
+        if stamps is None:
+            stamps = {}
+        window = self.bundle.window
+        if self.stream is None:
+            samples = np.array(ring.latest(window, end))
+            raw = {ch: samples[:, col] for ch, col in self.columns.items()}
+            return classify(self.bundle, self.extractor, raw, stamps)
+
+        if self.end is None or not 0 <= end - self.end <= window:
+            # First call, or samples were skipped: start over from the window
+            self.stream.reset()
+            self.end = end - window
+        new = ring.latest(end - self.end, end)
+        self.stream.push(new[:, [self.columns["flexor"], self.columns["extensor"]]])
+        self.end = end
+        stamps["convert"] = time.perf_counter()
+        feats = self.stream.features()
+        stamps["features"] = time.perf_counter()
+        return _predict(self.bundle, feats, stamps)
+
+
+def _serve(ring, bundle_path, columns, hop, results, stop, ready, commands, spec):
+    from model_bundle import load_bundle
+
+    bundle = load_bundle(bundle_path)
+    classifier = WindowClassifier(bundle, bundle.extractor(*spec), columns)
+    window = bundle.window
+    skipped = 0
+    next_end = window
+    ready.set()
+    while not stop.is_set():
+        total = ring.total
+        if total < next_end:
+            try:
+                bundle_path = commands.get_nowait()
+            except queue.Empty:
+                time.sleep(0.001)
+                continue
+            # Switch models between two windows (e.g. a calibrated user profile)
+            bundle = load_bundle(bundle_path)
+            classifier = WindowClassifier(bundle, bundle.extractor(*spec), columns)
+            window = bundle.window
+            next_end = max(next_end, window)
+            results.put(("reloaded", bundle_path))
+            continue
+        seen = time.time()
+        t0 = time.perf_counter()
+        stamps = {"seen": t0}
+        end = next_end
+        if total - end >= hop:
+            # Behind by more than one hop: classify the newest window instead
+            skipped += (total - end) // hop
+            end = total
+        if end < total - ring.capacity + window:
+            end = total
+        label, proba, x, feats = classifier(ring, end, stamps)
+        results.put(
+            Prediction(end, seen, label, proba, x, feats, stamps["predict"] - t0, stamps)
+        )
+        next_end = end + hop
+    results.put(("skipped", skipped))
+
+
+def _main(ring, bundle_path, columns, hop, results, stop, ready, commands, spec):
+    # The forked process inherits the shared mapping of `ring`; the GUI
+    # process owns and unlinks the block
+    try:
+        _serve(ring, bundle_path, columns, hop, results, stop, ready, commands, spec)
+    except Exception as e:
+        print("⚠️ Inference worker failed:", e)
+        results.put(("error", str(e)))
+
+
+class InferenceWorker:
+    """
+    Owns the worker process (or thread) and collects its predictions.
+
+    spec: (features, channels) of the feature_registry set the script is
+    written for; every bundle the worker loads is validated against it.
+    """
+
+    def __init__(self, bundle_path, ring, columns, hop=50, history=1000, spec=(None, None)):
+        self.bundle_path = bundle_path
+        self.ring = ring
+        self.columns = dict(columns)
+        self.hop = hop
+        self.process = None
+        self.received = 0
+        self.skipped = 0
+        self.error = None
+        self.reloaded = None  # bundle path of the last completed reload()
+        self.latencies = deque(maxlen=history)  # worker processing, seconds
+        self.delays = deque(maxlen=history)  # queue delay until results(), seconds
+
+        if "fork" in multiprocessing.get_all_start_methods():
+            ctx = multiprocessing.get_context("fork")
+            self._queue, self._stop, self._ready = ctx.Queue(), ctx.Event(), ctx.Event()
+            self._commands = ctx.Queue()
+            worker_class = ctx.Process
+        else:
+            self._queue, self._stop, self._ready = queue.Queue(), threading.Event(), threading.Event()
+            self._commands = queue.Queue()
+            worker_class = threading.Thread
+        self.process = worker_class(
+            target=_main,
+            args=(
+                ring,
+                bundle_path,
+                self.columns,
+                hop,
+                self._queue,
+                self._stop,
+                self._ready,
+                self._commands,
+                tuple(spec),
+            ),
+            name="inference",
+            daemon=True,
+        )
+
+    def start(self, timeout=30.0):
+        """Start the worker and wait until it has loaded the bundle."""
+        self.process.start()
+        deadline = time.time() + timeout
+        # A worker that fails to load the bundle ends without setting ready
+        while not self._ready.wait(0.05):
+            if not self.process.is_alive() or time.time() > deadline:
+                self.process.join(0.5)
+                self.results()
+                raise RuntimeError(f"Inference worker did not start: {self.error or 'timeout'}")
+        print(f"✅ Inference worker running ({type(self.process).__name__})")
+
+    def _handle(self, item):
+        if isinstance(item, Prediction):
+            self.received += 1
+            self.latencies.append(item.latency)
+            self.delays.append(max(time.time() - item.t - item.latency, 0.0))
+            return item
+        kind, value = item
+        if kind == "skipped":
+            self.skipped = value
+        elif kind == "reloaded":
+            self.bundle_path = self.reloaded = value
+        elif kind == "error":
+            self.error = value
+        return None
+
+    def reload(self, bundle_path):
+        """Switch the worker to another bundle; `reloaded` is set once it has."""
+        self.reloaded = None
+        self._commands.put(bundle_path)
+
+    def results(self):
+        """All predictions that arrived since the last call (oldest first)."""
+        out = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return out
+            prediction = self._handle(item)
+            if prediction is not None:
+                out.append(prediction)
+
+    def stats(self):
+        """Worker latency and queue delay percentiles in milliseconds."""
+        lat = np.array(self.latencies) * 1e3 if self.latencies else np.zeros(1)
+        delay = np.array(self.delays) * 1e3 if self.delays else np.zeros(1)
+        return {
+            "predictions": self.received,
+            "skipped": self.skipped,
+            "latency_p50_ms": float(np.percentile(lat, 50)),
+            "latency_p95_ms": float(np.percentile(lat, 95)),
+            "latency_max_ms": float(lat.max()),
+            "queue_p50_ms": float(np.percentile(delay, 50)),
+            "queue_p95_ms": float(np.percentile(delay, 95)),
+        }
+
+    def stats_text(self):
+        s = self.stats()
+        return (
+            f"inference {s['predictions']} | latency p50 {s['latency_p50_ms']:.2f} ms, "
+            f"p95 {s['latency_p95_ms']:.2f} ms, max {s['latency_max_ms']:.2f} ms | "
+            f"queue p50 {s['queue_p50_ms']:.2f} ms | skipped {s['skipped']}"
+        )
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        self.process.join(timeout)
+        if isinstance(self.process, multiprocessing.process.BaseProcess) and self.process.is_alive():
+            self.process.terminate()
+        self.results()
@@ -0,0 +1,175 @@
+"""
+End-to-end latency tracing from device.read() to the visible result.
+
+Every chunk is stamped with time.perf_counter() when device.read() returns
+(AcquisitionThread.clock / DeviceInput.read_time). The code that handles
+the chunk records when it passed each stage, and LatencyTracer keeps the
+time since the read per stage in a rolling window:
+
+    tracer = tracer_from_env(["features", "predict", "render"], "emg_classification")
+    t_read = acquisition.read_time(end)
+    tracer.record(t_read, {"features": t1, "predict": t2})
+    ...
+    tracer.mark("render", t_read)  # from the widget's paintEvent, once the result is drawn
+    overlay.setText(tracer.text())
+
+perf_counter() is the system-wide monotonic clock on Linux, so stamps taken
+in a forked inference process can be compared with the GUI's.
+
+BITALINO_TRACE=<folder or .json> dumps the percentiles, histograms and raw
+samples when the script exits; compare two dumps of different builds with
+
+    python latency_trace.py before.json after.json
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+# Histogram bins (ms) of the dump, logarithmic from 0.1 ms to 10 s
+HIST_EDGES_MS = np.logspace(-1, 4, 51)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            timeout=2,
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+class LatencyTracer:
+    """
+    Rolling per-stage latencies (milliseconds since the chunk was read).
+
+    stages: stage names in pipeline order; a stage's value is cumulative, so
+    the difference between neighbouring stages is the time spent in between.
+    """
+
+    def __init__(self, stages, history=2000, name="trace"):
+        self.stages = list(stages)
+        self.name = name
+        self.samples = {stage: deque(maxlen=history) for stage in self.stages}
+        self.counts = dict.fromkeys(self.stages, 0)
+        self.started = time.time()
+        self.target = None  # dump file of close(), set by tracer_from_env()
+
+    def mark(self, stage, t_read, t=None):
+        """Record that the chunk read at `t_read` passed `stage` at `t` (default: now)."""
+        if t_read is None:
+            return
+        if t is None:
+            t = time.perf_counter()
+        self.samples[stage].append(1e3 * (t - t_read))
+        self.counts[stage] += 1
+
+    def record(self, t_read, stamps):
+        """mark() for a {stage: perf_counter() time} dict."""
+        for stage, t in stamps.items():
+            self.mark(stage, t_read, t)
+
+    def stats(self):
+        """{stage: {"n", "p50", "p95", "p99", "max"}} over the rolling window (ms)."""
+        out = {}
+        for stage in self.stages:
+            values = np.array(self.samples[stage]) if self.samples[stage] else np.zeros(1)
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            out[stage] = {
+                "n": self.counts[stage],
+                "p50": float(p50),
+                "p95": float(p95),
+                "p99": float(p99),
+                "max": float(values.max()),
+            }
+        return out
+
+    def lines(self):
+        """Header plus one 'stage  p50 p95 p99' line (ms) per stage, for overlays."""
+        width = max(len("ms since read"), *(len(stage) for stage in self.stages))
+        lines = [f"{'ms since read':<{width}}  {'p50':>7} {'p95':>7} {'p99':>7}"]
+        for stage, s in self.stats().items():
+            lines.append(f"{stage:<{width}}  {s['p50']:7.1f} {s['p95']:7.1f} {s['p99']:7.1f}")
+        return lines
+
+    def text(self):
+        return "\n".join(self.lines())
+
+    def dump(self, path, **meta):
+        """Write the stats, histograms and raw samples to a JSON file."""
+        hist = {
+            stage: np.histogram(np.array(values), bins=HIST_EDGES_MS)[0].tolist()
+            for stage, values in self.samples.items()
+        }
+        data = {
+            "name": self.name,
+            "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+            "duration_s": time.time() - self.started,
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "machine": platform.node(),
+            "stages": self.stages,
+            "stats": self.stats(),
+            "hist_edges_ms": HIST_EDGES_MS.tolist(),
+            "hist": hist,
+            "samples_ms": {stage: list(values) for stage, values in self.samples.items()},
+            **meta,
+        }
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp, path)
+        print("✅ Latency trace saved to", path)
+        return path
+
+    def close(self):
+        """Dump to the BITALINO_TRACE target, if tracer_from_env() found one."""
+        if self.target:
+            self.dump(self.target)
+
+
+def tracer_from_env(stages, name="trace", history=2000):
+    """LatencyTracer that dumps itself on close() if BITALINO_TRACE is set."""
+    tracer = LatencyTracer(stages, history, name)
+    target = os.environ.get("BITALINO_TRACE")
+    if target and not target.endswith(".json"):
+        os.makedirs(target, exist_ok=True)
+        target = os.path.join(target, f"{name}_{time.strftime('%Y-%m-%d_%H-%M-%S')}.json")
+    tracer.target = target
+    return tracer
+
+
+def compare(paths):
+    """Table of p50 / p95 / p99 per stage for several dumps."""
+    dumps = [json.load(open(path)) for path in paths]
+    stages = list(dict.fromkeys(stage for d in dumps for stage in d["stages"]))
+    lines = []
+    for stage in stages:
+        lines.append(stage)
+        for path, d in zip(paths, dumps):
+            s = d["stats"].get(stage)
+            if s is None:
+                continue
+            label = f"{os.path.basename(path)} ({d.get('commit') or '?'})"
+            lines.append(
+                f"  {label:<50} p50 {s['p50']:7.2f}  p95 {s['p95']:7.2f}  "
+                f"p99 {s['p99']:7.2f}  n {s['n']}"
+            )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python latency_trace.py trace.json [other.json ...]")
+        sys.exit(1)
+    print(compare(sys.argv[1:]))
@@ -1,18 +1,21 @@
+import os
 import time
 import numpy as np
-import joblib
-from collections import deque
-from bitalino import BITalino
+from device_source import open_device
 import pyqtgraph as pg
-from pyqtgraph.Qt import QtWidgets, QtCore
-from scipy.signal import welch
-from scipy.stats import entropy
-import biosignalsnotebooks as bsnb
+from pyqtgraph.Qt import QtWidgets, QtCore, QtGui
 from PyQt5.QtGui import QPixmap
 from PyQt5.QtWidgets import QLabel
-from sklearn.preprocessing import StandardScaler
 
-from feature_utils import extract_emg_features
+from model_bundle import load_bundle
+from feature_registry import EMG_CHANNELS, EMG_FEATURES
+from acquisition import AcquisitionThread
+from recorder import recorder_from_env
+from inference_worker import InferenceWorker
+from shared_stream import SharedRing
+from gesture_decoder import DECODER_PRESETS, GestureDecoder
+from latency_trace import tracer_from_env
+from calibration import Calibration, profile_path
 
 # --------------------------
 # CONFIGURATION
@@ -22,21 +25,47 @@ acqChannels_real = [2, 4]  #CH2 = flexor, CH4 = extensor
 acqChannels = [ch - 1 for ch in acqChannels_real]
 fs = 1000
 nSamples = 50
-window_size = int(0.5 * fs)  # 0.5 s window
-update_period = 0.25  # classify every 0.25 s
+decoder_preset = "balanced"  # "fast" / "balanced" / "stable" (gesture_decoder.py)
+history_secs = 5
+bundle_path = "model_2/emg_mlp.bundle"
+# Per-user profile: loaded instead of the generic model once it exists.
+# Press C (or start with BITALINO_CALIBRATE=1) to calibrate: hold each
+# gesture for a few seconds, the model is fine-tuned in the background.
+user = os.environ.get("BITALINO_USER", "default")
+user_profile = profile_path(user)
+if os.path.exists(user_profile):
+    bundle_path = user_profile
 
-# Load trained model and normalization
-model = joblib.load("model_2/nn_classifier.pkl")
-# max_per_feature = np.load("model_2/max_per_feature.npy")
-scaler = joblib.load("model_2/feature_scaler.pkl")
-gesture_names = ["relax", "rock", "paper", "scissors"]
-print("✅ Loaded MLP model")
+# Model, scaler, window and class names of the training run, loaded once
+# (scaler + MLP run as plain NumPy, same predictions as sklearn)
+bundle = load_bundle(bundle_path)
+window_size = bundle.window  # 0.5 s window
+gesture_names = bundle.class_names
+print("✅ Loaded", bundle.describe())
+
+# --------------------------
+# Inference process
+# --------------------------
+# Samples go into a shared-memory buffer; a separate process classifies
+# every new chunk and sends the predictions back, so a slow feature
+# extraction never blocks the plots. Started (forked) before the device
+# connection and the Qt application exist.
+max_samples = fs * history_secs
+buffer = SharedRing.create(max_samples + fs, len(acqChannels), dtype=float)  # 1 s headroom for the reader
+worker = InferenceWorker(
+    bundle_path,
+    buffer,
+    {"flexor": 0, "extensor": 1},
+    hop=nSamples,
+    spec=(EMG_FEATURES, EMG_CHANNELS),  # refuses bundles trained on other features
+)
+worker.start()
 
 # --------------------------
 # BITalino connection
 # --------------------------
 print(f"Connecting to BITalino device {macAddress} ...")
-device = BITalino(macAddress)
+device = open_device(macAddress)
 device.start(fs, acqChannels)
 print("Connected and acquisition started")
 
@@ -45,7 +74,22 @@ print("Connected and acquisition started")
 # --------------------------
 app = QtWidgets.QApplication([])
 pg.setConfigOptions(antialias=True)
-win = pg.GraphicsLayoutWidget(show=True, title="BITalino Real-Time EMG Classification")
+TITLE = "BITalino Real-Time EMG Classification"
+unpainted_read = None  # read time of the newest result not yet on screen
+
+
+class TracedLayoutWidget(pg.GraphicsLayoutWidget):
+    """Marks the "render" latency stage once a new result has been painted."""
+
+    def paintEvent(self, event):
+        global unpainted_read
+        super().paintEvent(event)
+        if unpainted_read is not None:
+            tracer.mark("render", unpainted_read)
+            unpainted_read = None
+
+
+win = TracedLayoutWidget(show=True, title=TITLE)
 win.resize(1600, 1200)
 win.ci.layout.setColumnStretchFactor(0, 3)  # EMG plots (left column) → 3x wider
 win.ci.layout.setColumnStretchFactor(1, 1)  # Image column → narrower
@@ -74,8 +118,13 @@ for i, ch in enumerate(acqChannels):
 img_label = QLabel()
 img_label.setAlignment(QtCore.Qt.AlignCenter)  # 👈 center the image
 img_label.setStyleSheet("background-color: black;")  
-pixmap = QPixmap("icons/image_none.png")
-img_label.setPixmap(pixmap.scaled(200, 200, QtCore.Qt.KeepAspectRatio))
+pixmaps = {
+    gesture: QPixmap(
+        f"icons/image_{gesture.lower()}.png" if gesture != "relax" else "icons/image_none.png"
+    ).scaled(200, 200, QtCore.Qt.KeepAspectRatio)
+    for gesture in gesture_names
+}
+img_label.setPixmap(pixmaps["relax"])
 proxy_img = QtWidgets.QGraphicsProxyWidget()
 proxy_img.setWidget(img_label)
 
@@ -97,96 +146,132 @@ feature_plot.setLabel("left", "Normaized Feature Values")
 feature_plot.setLabel("bottom", "Feature")
 feature_plot.setYRange(-3, 3)
 
-feature_names = [
-    "F_std",
-    "F_max",
-    "F_zcr",
-    "F_stdAbs",
-    "F_wl",
-    "F_wamp",
-    "F_sc",
-    "F_se",
-    "E_std",
-    "E_max",
-    "E_zcr",
-    "E_stdAbs",
-    "E_wl",
-    "E_wamp",
-    "E_sc",
-    "E_se",
-    "ratio",
-]
-feature_bar = pg.BarGraphItem(
-    x=np.arange(len(feature_names)),
-    height=np.zeros(len(feature_names)),
-    width=0.6,
-    brush="orange",
-)
+feature_bar = pg.BarGraphItem(x=[], height=[], width=0.6, brush="orange")
 feature_plot.addItem(feature_bar)
-feature_plot.getAxis("bottom").setTicks([list(enumerate(feature_names))])
+
+
+def show_features(bundle):
+    """Label one bar per feature the bundle's model uses (after its mask)."""
+    global feature_names
+    feature_names = bundle.extractor(EMG_FEATURES, EMG_CHANNELS).names
+    x = np.arange(len(feature_names))
+    feature_bar.setOpts(x=x, height=np.zeros(len(x)))
+    feature_plot.getAxis("bottom").setTicks([list(enumerate(feature_names))])
+
+
+show_features(bundle)
+
+# Latency overlay: ms from device.read() to each stage (p50 / p95 / p99)
+trace_label = pg.LabelItem(justify="left", color="#aaa")
+win.addItem(trace_label, row=len(acqChannels) + 2, col=0, colspan=2)
 
 
 # --------------------------
 # Buffers
 # --------------------------
-history_secs = 5
-max_samples = fs * history_secs
-data = [deque(maxlen=max_samples) for _ in acqChannels]
-buffer = np.empty((0, len(acqChannels)))
-last_update_time = time.time()
-last_predictions = deque(maxlen=5)  # for smoothing
+t_axis = np.arange(max_samples) / fs
+# BITALINO_TRACE=<folder> also dumps the latencies on exit
+tracer = tracer_from_env(
+    ["seen", "convert", "features", "scale", "predict", "received", "decoded", "render"],
+    "emg_classification",
+)
+# Smooths the predictions with the model's probabilities (HMM forward filter)
+decoder = GestureDecoder(len(bundle.model.classes), **DECODER_PRESETS[decoder_preset])
+last_total = 0
+last_gesture = None
+calibration = None
+pending_profile = None  # profile the worker is switching to
+
+# Device reads run in their own thread; the GUI only renders what arrived
+# BITALINO_RECORD=<folder> also saves the raw session plus the predictions
+recorder = recorder_from_env(fs, acqChannels, "emg_classification", ["EMGBITREV"] * 2)
+acquisition = AcquisitionThread(
+    device, nSamples, buffer, fs=fs, fill="interp", recorder=recorder
+)
+acquisition.start()
 
 
 # --------------------------
 # Live update function
 # --------------------------
+def start_calibration():
+    global calibration, last_gesture
+    calibration = Calibration(bundle, user_profile)
+    last_gesture = None
+    print(f"Calibrating profile {user_profile} ...")
+
+
+def on_calibrate_key():
+    if calibration is None:
+        start_calibration()
+
+
+calibrate_shortcut = QtWidgets.QShortcut(QtGui.QKeySequence("C"), win)
+calibrate_shortcut.activated.connect(on_calibrate_key)
+if os.environ.get("BITALINO_CALIBRATE") == "1":
+    start_calibration()
+
+
+def update_calibration(results):
+    """Feed the calibration; hand the profile to the worker once it is trained."""
+    global calibration, pending_profile
+    for p in results:
+        calibration.add(p)
+    label.setText(f"<h2>{calibration.prompt()}</h2>")
+    i, _ = calibration.phase
+    if i < len(calibration.classes):
+        img_label.setPixmap(pixmaps[calibration.gesture(i)])
+    if calibration.finished:
+        worker.reload(calibration.profile)
+        pending_profile = calibration.profile
+    if calibration.finished or calibration.error:
+        calibration = None
+
+
 def update():
-    global buffer, last_update_time
+    global last_total, last_gesture, bundle, pending_profile, unpainted_read
     try:
-        samples = device.read(nSamples)
-        analog = samples[:, 5:].astype(float)
-        buffer = np.vstack([buffer, analog])
-        if buffer.shape[0] > max_samples:
-            buffer = buffer[-max_samples:]
-
-        t = np.arange(buffer.shape[0]) / fs
-        for j, ch in enumerate(acqChannels):
-            data[j].clear()
-            data[j].extend(buffer[:, j])
-            curves[j].setData(t, buffer[:, j])
-            plots[j].setXRange(max(0, t[-1] - history_secs), t[-1])
-
-        # Classify every 0.25 s
-        if (
-            time.time() - last_update_time > update_period
-            and buffer.shape[0] >= window_size
-        ):
-            window = buffer[-window_size:, :]
-            feats = extract_emg_features(window, fs=fs)
-            feats = scaler.transform([feats])[0]
-
-            feature_bar.setOpts(height=feats)
-
-            flex_std = np.std(window[:, 0])
-            ext_std = np.std(window[:, 1])
-
-            pred = model.predict([feats])[0]
-
-            # Smooth prediction using majority of last 5
-            last_predictions.append(pred)
-            smoothed_pred = max(set(last_predictions), key=last_predictions.count)
-            gesture = gesture_names[smoothed_pred]
-            label.setText(f"<h2>Predicted: <b>{gesture}</b></h2>")
-            print("Pred:", gesture)
-            last_update_time = time.time()
-
-            img_path = (
-                f"icons/image_{gesture.lower()}.png"
-                if gesture != "relax"
-                else "icons/image_none.png"
-            )
-            pixmap = QPixmap(img_path)
-            img_label.setPixmap(pixmap.scaled(200, 200, QtCore.Qt.KeepAspectRatio))
+        total = buffer.total
+        if total != last_total:
+            last_total = total
+            history = buffer.latest(max_samples, end=total)
+
+            t = t_axis[: len(history)]
+            for j, ch in enumerate(acqChannels):
+                curves[j].setData(t, history[:, j])
+                plots[j].setXRange(max(0, t[-1] - history_secs), t[-1])
+
+        # Predictions of the inference process (one per chunk)
+        results = worker.results()
+        if calibration is not None:
+            update_calibration(results)
+            return
+        if pending_profile and worker.reloaded == pending_profile:
+            bundle = load_bundle(pending_profile)
+            print("✅ Using", bundle.describe())
+            show_features(bundle)
+            decoder.reset()
+            pending_profile = None
+        if results:
+            t_received = time.perf_counter()
+            if len(results[-1].features) == len(feature_names):
+                feature_bar.setOpts(height=results[-1].features)
+
+            for p in results:
+                state = decoder.update(p.proba)
+                t_read = acquisition.read_time(p.end)
+                tracer.record(t_read, p.stamps)
+                tracer.mark("received", t_read, t_received)
+                tracer.mark("decoded", t_read)
+            gesture = gesture_names[bundle.model.classes[state]]
+            if gesture != last_gesture:
+                label.setText(f"<h2>Predicted: <b>{gesture}</b></h2>")
+                print("Pred:", gesture)
+                if recorder:
+                    recorder.annotate(gesture)
+                last_gesture = gesture
+                img_label.setPixmap(pixmaps[gesture])
+            unpainted_read = t_read
 
     except Exception as e:
         print("Error:", e)
@@ -199,6 +284,16 @@ timer = QtCore.QTimer()
 timer.timeout.connect(update)
 timer.start(10)
 
+# Lost frames / overruns in the title bar, refreshed once per second
+def update_status():
+    win.setWindowTitle(f"{TITLE} | {acquisition.status_text()} | {worker.stats_text()}")
+    trace_label.setText("<pre>" + tracer.text() + "</pre>")
+
+
+status_timer = QtCore.QTimer()
+status_timer.timeout.connect(update_status)
+status_timer.start(1000)
+
 # --------------------------
 # Run app
 # --------------------------
@@ -207,6 +302,15 @@ try:
 except KeyboardInterrupt:
     print("Interrupted by user.")
 finally:
+    acquisition.stop()
+    worker.stop()
+    print("Acquisition:", acquisition.stats_text())
+    print("Inference:", worker.stats_text())
+    print(tracer.text())
+    tracer.close()
+    buffer.close()
+    if recorder:
+        recorder.close()
     device.stop()
     device.close()
     print("BITalino connection closed.")
@@ -1,17 +1,16 @@
+import os
 import time
 import sys
 import numpy as np
-import joblib
-from collections import deque
-from bitalino import BITalino
+from device_source import open_device
 import pyqtgraph as pg
 from pyqtgraph.Qt import QtWidgets, QtCore
-from scipy.stats import linregress
-import biosignalsnotebooks as bsnb
 from PyQt5.QtGui import QPixmap
 from PyQt5.QtWidgets import QLabel
-from scipy.stats import entropy
-from scipy.signal import welch
+
+from feature_registry import KNN_CHANNELS, KNN_FEATURES
+from model_bundle import bundle_legacy_knn, load_bundle
+from ring_buffer import RingBuffer
 
 # --------------------------
 # CONFIG
@@ -24,17 +23,27 @@ samplingRate = 1000
 nSamples = 100
 window_size = 2500  # 1 second window for feature extraction
 
-# Load your trained model
-model = joblib.load("model/knn_classifier.pkl")
-print("Loaded KNN model")
-acception_labels = np.load("model/acception_labels.npy")
-print("Loaded feature mask:", acception_labels)
+# Load your trained model: KNN, feature mask, max_per_feature and the feature
+# spec it was trained with (saved by rock_paper_scissor.ipynb), loaded once
+# (the pickled model of an older notebook run is bundled on first use)
+bundle_path = "model/knn_classifier.bundle"
+try:
+    if not os.path.exists(bundle_path):
+        bundle_legacy_knn(bundle_path)
+    bundle = load_bundle(bundle_path)
+    # Only the features selected by the mask are computed
+    extractor = bundle.extractor(KNN_FEATURES, KNN_CHANNELS)
+except (OSError, ValueError) as e:
+    sys.exit(f"Cannot use {bundle_path} ({e}); re-run rock_paper_scissor.ipynb")
+window_size = bundle.window or window_size
+print("Loaded", bundle.describe())
+print("Features:", extractor.describe(), extractor.names)
 
 # --------------------------
 # BITalino connection
 # --------------------------
 print(f"Connecting to BITalino device {macAddress} ...")
-device = BITalino(macAddress)
+device = open_device(macAddress)
 device.start(samplingRate, acqChannels)
 print("Connected and acquisition started")
 
@@ -81,126 +90,49 @@ win.addItem(proxy, row=1, col=1, rowspan=len(acqChannels_plot))
 
 history_secs = 10
 max_samples = samplingRate * history_secs
-data = [deque(maxlen=max_samples) for _ in acqChannels]
-x_axis = deque(maxlen=max_samples)
-sample_counter = 0
+t_axis = np.arange(max_samples) / samplingRate
 
 
 # --------------------------
 # Feature extraction function
 # -------------------------
 
-def spectral(signal):
-    f, Pxx = welch(signal, fs=1000)
-    if np.sum(Pxx) == 0 or np.isnan(np.sum(Pxx)):
-        return 0.0, 0.0
-    else:
-        Pxx_norm = Pxx / (np.sum(Pxx) + 1e-12)
-        spectral_centroid = np.sum(f * Pxx_norm)
-        spectral_entropy = entropy(Pxx_norm)
-        return spectral_centroid, spectral_entropy
+# Buffer column of each feature channel ("CH2" = analog input A2)
+channel_columns = {ch: acqChannels.index(int(ch[2:]) - 1) for ch in extractor.channels}
+
 
 def extract_features(signal):
-    emg_flexor_channel = 1
-    emg_adductor_channel = 3
-    acc_channel = 2
-
-    signal = np.array(signal)
-    emg_flexor = signal[:, emg_flexor_channel]
-    emg_adductor = signal[:, emg_adductor_channel]
-    acc_z = signal[:, acc_channel]
-
-    emg_flexor_conv = bsnb.raw_to_phy(
-        "EMG",
-        device="biosignalsplux",
-        raw_signal=emg_flexor,
-        resolution=16,
-        option="mV",
-    )
-    emg_adductor_conv = bsnb.raw_to_phy(
-        "EMG",
-        device="biosignalsplux",
-        raw_signal=emg_adductor,
-        resolution=16,
-        option="mV",
-    )
-    acc_z_conv = bsnb.raw_to_phy(
-        "ACC", device="biosignalsplux", raw_signal=acc_z, resolution=16, option="g"
-    )
-    
-    spectral_centroid_flex, spectral_entropy_flex = spectral(emg_flexor_conv)
-    features_emg_flexor = [
-        np.std(emg_flexor_conv),
-        np.max(emg_flexor_conv),
-        np.sum(np.diff(np.sign(emg_flexor_conv)) != 0) / len(emg_flexor_conv),
-        np.std(np.abs(emg_flexor_conv)),
-        np.sum(np.abs(np.diff(emg_flexor_conv))),
-        np.sum(np.abs(np.diff(emg_flexor_conv)) > 0.02),
-        spectral_centroid_flex,
-        spectral_entropy_flex,
-    ]
-
-    spectral_centroid_add, spectral_entropy_add = spectral(emg_adductor_conv)
-    features_emg_adductor = [
-        np.std(emg_adductor_conv),
-        np.max(emg_adductor_conv),
-        np.sum(np.diff(np.sign(emg_adductor_conv)) != 0) / len(emg_adductor_conv),
-        np.std(np.abs(emg_adductor_conv)),
-        np.sum(np.abs(np.diff(emg_adductor_conv))),
-        np.sum(np.abs(np.diff(emg_adductor_conv)) > 0.02),
-        spectral_centroid_add,
-        spectral_entropy_add,
-    ]
-
-    m_acc_z = np.mean(acc_z_conv)
-    sigma_acc_z = np.std(acc_z_conv)
-    max_acc_z = np.max(acc_z_conv)
-    zcr_acc_z = np.sum(np.diff(np.sign(acc_z_conv)) != 0) / len(acc_z_conv)
-    slope_acc_z = linregress(np.arange(len(acc_z_conv)), acc_z_conv)[0]
-
-    features_acc = [m_acc_z, sigma_acc_z, max_acc_z, zcr_acc_z, slope_acc_z]
-    features_13 = np.concatenate(
-        [features_emg_flexor, features_emg_adductor, features_acc]
-    )
-
-    max_per_feature = np.load("model/max_per_feature.npy")
-    normalized_features_13 = features_13 / (max_per_feature + 1e-12)
-    return normalized_features_13
+    signal = np.asarray(signal)
+    raw = {ch: signal[:, col] for ch, col in channel_columns.items()}
+    return bundle.normalize(extractor.extract(raw))
 
 
 # --------------------------
 # Live update
 # --------------------------
-buffer = np.empty((0, len(acqChannels)))
+buffer = RingBuffer(max_samples, len(acqChannels))
 last_prediction = None
 last_update_time = time.time()
 
 
 def update():
-    global buffer, last_prediction, last_update_time
+    global last_prediction, last_update_time
     try:
         samples = device.read(nSamples)
-        analog = samples[:, 5:].astype(float)
-        buffer = np.vstack([buffer, analog])
-        if buffer.shape[0] > max_samples:
-            buffer = buffer[-max_samples:]
+        buffer.extend(samples[:, 5:])
+        history = buffer.latest()
 
-        t_values = np.arange(buffer.shape[0]) / samplingRate
-        x_axis.clear()
-        x_axis.extend(t_values)
+        t_values = t_axis[: len(history)]
 
         for j in range(len(acqChannels_plot)):
-            data[j].clear()
-            data[j].extend(buffer[:, j])
-            curves[j].setData(t_values, buffer[:, j])
+            curves[j].setData(t_values, history[:, j])
             plots[j].setXRange(max(0, t_values[-1] - history_secs), t_values[-1])
 
         # Every 1 second, classify
-        if time.time() - last_update_time > 0.5 and buffer.shape[0] >= window_size:
-            window = buffer[-window_size:]
-            feats = extract_features(window)
-            reduced = feats[acception_labels]
-            pred = model.predict([reduced])[0]
+        if time.time() - last_update_time > 0.5 and len(buffer) >= window_size:
+            window = buffer.latest(window_size)
+            reduced = extract_features(window)
+            pred = bundle.model.predict_one(reduced)
             last_prediction = pred
             label.setText(f"<h2>Predicted Class: <b>{pred}</b></h2>")
             last_update_time = time.time()
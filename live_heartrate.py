@@ -1,12 +1,14 @@
 import time
 import numpy as np
 from collections import deque
-from bitalino import BITalino
+from device_source import open_device
 import pyqtgraph as pg
 from pyqtgraph.Qt import QtWidgets, QtCore
-import biosignalsnotebooks as bsnb
-from scipy.signal import welch
-from scipy.signal import butter, filtfilt, welch, find_peaks
+
+from acquisition import AcquisitionThread
+from ecg_utils import compute_heart_rate
+from recorder import recorder_from_env
+from ring_buffer import RingBuffer
 
 # --------------------------
 # CONFIG
@@ -22,7 +24,7 @@ avg_window_secs = 10  # show 30 s average HR
 # BITalino connection
 # --------------------------
 print(f"Connecting to BITalino device {macAddress} ...")
-device = BITalino(macAddress)
+device = open_device(macAddress)
 device.start(samplingRate, acqChannels)
 print("Connected and acquisition started")
 
@@ -31,7 +33,8 @@ print("Connected and acquisition started")
 # --------------------------
 app = QtWidgets.QApplication([])
 pg.setConfigOptions(antialias=True)
-win = pg.GraphicsLayoutWidget(show=True, title="ECG Heart Rate Monitor")
+TITLE = "ECG Heart Rate Monitor"
+win = pg.GraphicsLayoutWidget(show=True, title=TITLE)
 win.resize(1500, 1000)
 
 # --- Heart Rate label (left) ---
@@ -65,84 +68,34 @@ trend_counter = 0
 # Buffers
 # --------------------------
 max_samples = samplingRate * avg_window_secs
-data = deque(maxlen=max_samples)
-x_axis = deque(maxlen=max_samples)
-sample_counter = 0
+# 1 s headroom so the acquisition thread never overwrites what is being drawn
+data = RingBuffer(max_samples + samplingRate)
+last_total = 0
 last_update_time = time.time()
 hr_history = deque(maxlen=avg_window_secs)
 
 
-def bandpass_filter(signal, fs, lowcut=0.5, highcut=40.0, order=4):
-    nyq = 0.5 * fs
-    low = lowcut / nyq
-    high = highcut / nyq
-    b, a = butter(order, [low, high], btype="band")
-    return filtfilt(b, a, signal)
-
-
-def compute_heart_rate(signal, fs):
-    # Convert raw → volts and then to mV
-    signal_V = bsnb.raw_to_phy(
-        "ECG", "biosignalsplux", signal, resolution=16, option="V"
-    )
-    signal_mV = signal_V * 1000
-
-    # --- Band-pass filter (0.5–40 Hz) ---
-    filtered = bandpass_filter(signal_mV, fs)
-
-    # # --- Auto-flip if inverted ---
-    # if np.mean(filtered) < 0:
-    #     filtered = -filtered
-
-    # --- Normalize amplitude if too small (<0.2 mV) ---
-    if np.std(filtered) < 0.2:
-        filtered = filtered * (0.2 / (np.std(filtered) + 1e-12))
-
-    # --- Adaptive threshold ---
-    thr = np.percentile(filtered, 95) * 0.6
-    thr = max(thr, 0.1)
-    # --- Smooth signal slightly to suppress T-waves ---
-    smoothness = 5  # Smoothing window size (1 disables smoothing)
-    filtered_smooth = np.convolve(filtered, np.ones(smoothness)/smoothness, mode='same')
-
-    # --- Require at least 0.6 s between R-peaks (≈100 BPM max) ---
-    min_distance = int(fs * 0.6)
-    peaks, _ = find_peaks(filtered_smooth, distance=min_distance, height=thr)
-    #  Alternative simpler peak detection without smoothing:
-
-    # peaks, _ = find_peaks(filtered, distance=fs * 0.25, height=thr)
-
-    bpm = 0.0
-    if len(peaks) > 1:
-        rr_intervals = np.diff(peaks) / fs
-        bpm = 60.0 / np.mean(rr_intervals)
-
-    return bpm, filtered
-
-
 # --------------------------
 # Live update loop
 # --------------------------
 def update():
-    global sample_counter, last_update_time, trend_counter
+    global last_total, last_update_time, trend_counter
     try:
-        samples = device.read(nSamples)
-        analog = samples[:, 5:].astype(float)
-        ecg_raw = -analog[:, 0]
-
-        for val in ecg_raw:
-            data.append(val)
-            x_axis.append(sample_counter / samplingRate)
-            sample_counter += 1
+        total = data.total
+        if total == last_total:
+            return
+        last_total = total
+        ecg_raw = -data.latest(max_samples, end=total)[:, 0]
+        x_axis = (total - len(ecg_raw) + np.arange(len(ecg_raw))) / samplingRate
 
         # Convert and plot ECG
-        _, ecg_mV = compute_heart_rate(np.array(data), samplingRate)
-        curve.setData(list(x_axis), ecg_mV)
+        _, ecg_mV = compute_heart_rate(ecg_raw, samplingRate)
+        curve.setData(x_axis, ecg_mV)
         plot.setXRange(max(0, x_axis[-1] - avg_window_secs), x_axis[-1])
 
         # Update HR label every second
-        if time.time() - last_update_time > 1.0 and len(data) >= window_size:
-            window = np.array(list(data)[-window_size:])
+        if time.time() - last_update_time > 1.0 and len(ecg_raw) >= window_size:
+            window = ecg_raw[-window_size:]
             bpm, _ = compute_heart_rate(window, samplingRate)
             hr_history.append(bpm)
             avg_hr = np.mean(hr_history)
@@ -153,6 +106,8 @@ def update():
                 f"<h3>avg over 30s</h3></div>"
             )
             print(f"Instant: {bpm:.1f} BPM | 30s avg: {avg_hr:.1f} BPM")
+            if recorder:
+                recorder.annotate(f"bpm {bpm:.1f}")
 
             # --- Update HR trend plot ---
             hr_trend_data.append(avg_hr)
@@ -179,10 +134,30 @@ def update():
 # --------------------------
 # Timer
 # --------------------------
+# Device reads run in their own thread; the timer only renders what arrived
+recorder = recorder_from_env(samplingRate, acqChannels, "ecg", ["ECGBITREV"])
+acquisition = AcquisitionThread(
+    device,
+    nSamples,
+    data,
+    transform=lambda s: s[:, 5],
+    fs=samplingRate,
+    fill="interp",
+    recorder=recorder,
+)
+acquisition.start()
+
 timer = QtCore.QTimer()
 timer.timeout.connect(update)
 timer.start(10)
 
+# Lost frames / overruns in the title bar, refreshed once per second
+status_timer = QtCore.QTimer()
+status_timer.timeout.connect(
+    lambda: win.setWindowTitle(f"{TITLE} | {acquisition.status_text()}")
+)
+status_timer.start(1000)
+
 # --------------------------
 # Run
 # --------------------------
@@ -191,6 +166,10 @@ try:
 except KeyboardInterrupt:
     print("Interrupted.")
 finally:
+    acquisition.stop()
+    print("Acquisition:", acquisition.stats_text())
+    if recorder:
+        recorder.close()
     device.stop()
     device.close()
     print("BITalino connection closed.")
@@ -0,0 +1,277 @@
+"""
+One versioned bundle per trained model.
+
+A bundle is a folder "<name>.bundle/" holding everything live inference
+needs, loaded once at startup:
+
+    meta.json     kind (mlp / knn), class names, fs, window, step, the full
+                  feature spec (feature_registry entries + channel
+                  conversions), FEATURE_SET_VERSION, the extractor version
+                  and a version hash over all of it
+    *.npy         compiled model parameters (compiled_models), feature mask
+                  and, for max-normalised models, max_per_feature
+
+A live script passes the feature_registry set it is written for to
+Bundle.extractor(), which applies the bundle's mask and validate()s the
+result against the training spec, so a model trained on other features (or
+an older FEATURE_SET_VERSION) fails at startup instead of producing wrong
+predictions:
+
+    bundle = load_bundle("model_2/emg_mlp.bundle")
+    extractor = bundle.extractor(EMG_FEATURES, EMG_CHANNELS)
+    pred = bundle.predict_one(extractor.extract(raw))
+
+Tools that take any bundle (evaluate_stream.py) call bundle.extractor()
+without a set and get the extractor of the bundle's own spec.
+
+    python model_bundle.py  # bundle model_2/nn_classifier.pkl + feature_scaler.pkl and the KNN
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from compiled_models import CompiledKNN, CompiledMLP, knn_arrays, mlp_arrays
+from feature_registry import FEATURE_SET_VERSION, FeatureExtractor
+
+BUNDLE_FORMAT = 1
+_MODELS = {"mlp": CompiledMLP, "knn": CompiledKNN}
+
+
+def _version_hash(meta, arrays):
+    h = hashlib.sha1(json.dumps(meta, sort_keys=True).encode())
+    for name in sorted(arrays):
+        h.update(name.encode())
+        h.update(np.ascontiguousarray(arrays[name]).tobytes())
+    return h.hexdigest()[:12]
+
+
+def save_bundle(
+    path,
+    model,
+    extractor,
+    class_names,
+    window=None,
+    step=None,
+    scaler=None,
+    max_per_feature=None,
+):
+    """
+    Bundle a fitted MLPClassifier (+ StandardScaler) or KNeighborsClassifier.
+
+    extractor: the (masked) FeatureExtractor that produced the training data
+    max_per_feature: per-feature maxima over all extractor.all_features for
+    max-normalised models (the KNN notebook)
+    """
+    if hasattr(model, "coefs_"):
+        kind, arrays = "mlp", mlp_arrays(model, scaler)
+    else:
+        kind, arrays = "knn", knn_arrays(model)
+    arrays["mask"] = extractor.mask
+    if max_per_feature is not None:
+        max_per_feature = np.asarray(max_per_feature, dtype=float)
+        if len(max_per_feature) != len(extractor.all_features):
+            raise ValueError(
+                f"max_per_feature has {len(max_per_feature)} entries, "
+                f"expected {len(extractor.all_features)}"
+            )
+        arrays["max_per_feature"] = max_per_feature
+
+    strings = {k: str(v) for k, v in arrays.items() if np.asarray(v).dtype.kind == "U"}
+    arrays = {k: np.asarray(v) for k, v in arrays.items() if k not in strings}
+    meta = {
+        "format": BUNDLE_FORMAT,
+        "kind": kind,
+        "class_names": list(class_names),
+        "fs": extractor.fs,
+        "window": window,
+        "step": step,
+        "features": [[name, list(chs)] for name, chs in extractor.all_features],
+        "channels": {ch: list(conv) for ch, conv in extractor.channels.items()},
+        "feature_set_version": FEATURE_SET_VERSION,
+        "extractor_version": extractor.version,
+        "strings": strings,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    meta["version"] = _version_hash({k: v for k, v in meta.items() if k != "created"}, arrays)
+
+    tmp = path.rstrip("/") + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, values in arrays.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), values)
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=1)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+    print(f"✅ Saved {kind} bundle {path} (version {meta['version']})")
+    return path
+
+
+class Bundle:
+    def __init__(self, path, meta, arrays):
+        self.path = path
+        self.meta = meta
+        self.arrays = arrays
+        self.version = meta["version"]
+        self.kind = meta["kind"]
+        self.class_names = meta["class_names"]
+        self.fs = meta["fs"]
+        self.window = meta["window"]
+        self.step = meta["step"]
+        self.mask = arrays["mask"].astype(bool)
+        self.model = _MODELS[self.kind]({**arrays, **meta["strings"]})
+        self.feature_scale = None
+        if "max_per_feature" in arrays:
+            self.feature_scale = arrays["max_per_feature"][self.mask] + 1e-12
+        if self.model.n_features != self.mask.sum():
+            raise ValueError(
+                f"{path}: model takes {self.model.n_features} features, "
+                f"mask selects {self.mask.sum()}"
+            )
+
+    def extractor(self, features=None, channels=None):
+        """
+        The masked FeatureExtractor for the model. features / channels: the
+        registry set the caller computes (e.g. EMG_FEATURES, EMG_CHANNELS),
+        checked with validate(); by default the bundle's own feature spec.
+        """
+        if features is None:
+            features = [(name, tuple(chs)) for name, chs in self.meta["features"]]
+        if channels is None:
+            channels = {ch: tuple(conv) for ch, conv in self.meta["channels"].items()}
+        if len(features) != len(self.mask):
+            raise ValueError(
+                f"{self.path} was trained on a set of {len(self.mask)} features, "
+                f"the caller computes {len(features)}; retrain the model"
+            )
+        extractor = FeatureExtractor(features, channels, self.fs, mask=self.mask)
+        self.validate(extractor)
+        return extractor
+
+    def validate(self, extractor):
+        """Raise ValueError unless `extractor` computes the features the model expects."""
+        if self.meta["feature_set_version"] != FEATURE_SET_VERSION:
+            raise ValueError(
+                f"{self.path} was trained with feature set v{self.meta['feature_set_version']}, "
+                f"this code computes v{FEATURE_SET_VERSION}; retrain the model"
+            )
+        if extractor.version != self.meta["extractor_version"]:
+            raise ValueError(
+                f"{self.path} expects features {self.meta['extractor_version']} "
+                f"but the extractor computes {extractor.version} "
+                f"({extractor.describe()}); retrain the model"
+            )
+
+    def normalize(self, feats):
+        """Masked features -> model input (max scaling or the MLP's StandardScaler)."""
+        if self.feature_scale is not None:
+            return np.asarray(feats, dtype=float) / self.feature_scale
+        if self.kind == "mlp":
+            return self.model.transform(feats)
+        return np.asarray(feats, dtype=float)
+
+    def predict_one(self, feats):
+        """Class of one masked, unnormalised feature vector."""
+        x = self.normalize(feats)
+        if self.kind == "mlp":
+            return self.model.predict_one(x, scaled=True)
+        return self.model.predict_one(x)
+
+    def predict_proba_one(self, feats, normalized=False):
+        """Class probabilities (order of model.classes) of one feature vector."""
+        x = np.asarray(feats if normalized else self.normalize(feats), dtype=float)[None]
+        if self.kind == "mlp":
+            return self.model.predict_proba(x, scaled=True)[0]
+        return self.model.predict_proba(x)[0]
+
+    def describe(self):
+        return (
+            f"{self.kind} bundle {self.version} ({self.meta['created']}), "
+            f"{int(self.mask.sum())}/{len(self.mask)} features, "
+            f"fs {self.fs}, window {self.window}, classes {self.class_names}"
+        )
+
+
+def load_bundle(path, mmap=False):
+    """Load a bundle; mmap=True memory-maps the parameter arrays."""
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"{path}: unsupported bundle format {meta.get('format')}")
+    arrays = {
+        os.path.splitext(name)[0]: np.load(
+            os.path.join(path, name), mmap_mode="r" if mmap else None, allow_pickle=False
+        )
+        for name in os.listdir(path)
+        if name.endswith(".npy")
+    }
+    return Bundle(path, meta, arrays)
+
+
+def bundle_legacy_knn(path="model/knn_classifier.bundle", data_folder="data_1_and_2"):
+    """
+    Bundle the pickled KNN of rock_paper_scissor.ipynb (model/knn_classifier.pkl,
+    acception_labels.npy, max_per_feature.npy). A max_per_feature.npy that does
+    not match KNN_FEATURES (the notebook without accelerometer writes the same
+    file) is recomputed from the training recordings in `data_folder`, which
+    must reproduce the KNN's training set.
+    """
+    import glob
+
+    import joblib
+
+    from feature_registry import KNN_CHANNELS, KNN_FEATURES
+    from parallel_features import FeatureJob, extract_recordings
+
+    model = joblib.load("model/knn_classifier.pkl")
+    mask = np.load("model/acception_labels.npy")
+    max_per_feature = np.load("model/max_per_feature.npy")
+    if len(max_per_feature) != len(KNN_FEATURES):
+        full = FeatureExtractor(KNN_FEATURES, KNN_CHANNELS, 1000)
+        paths = sorted(glob.glob(os.path.join(data_folder, "*.txt")))
+        jobs = [FeatureJob(p, {ch: ch for ch in KNN_CHANNELS}, full) for p in paths]
+        features = np.array(extract_recordings(jobs, verbose=False))
+        max_per_feature = features.max(axis=0)
+        training = (features / (max_per_feature + 1e-12))[:, mask]
+        fit_X = knn_arrays(model)["fit_X"]
+        if training.shape != fit_X.shape or not np.allclose(
+            np.sort(training, axis=0), np.sort(fit_X, axis=0)
+        ):
+            raise ValueError(
+                f"model/max_per_feature.npy does not match KNN_FEATURES and {data_folder} "
+                "does not reproduce the KNN's training set; re-run rock_paper_scissor.ipynb"
+            )
+        print(f"⚠️ Recomputed max_per_feature from {len(paths)} recordings in {data_folder}")
+    return save_bundle(
+        path,
+        model,
+        FeatureExtractor(KNN_FEATURES, KNN_CHANNELS, 1000, mask=mask),
+        ["relax", "paper", "rock", "scissors"],
+        window=2500,  # live_classification.py window
+        max_per_feature=max_per_feature,
+    )
+
+
+if __name__ == "__main__":
+    import joblib
+
+    from feature_registry import EMG_CHANNELS, EMG_FEATURES
+
+    # Bundle the committed MLP (rock_paper_scissors_2.py settings)
+    save_bundle(
+        "model_2/emg_mlp.bundle",
+        joblib.load("model_2/nn_classifier.pkl"),
+        FeatureExtractor(EMG_FEATURES, EMG_CHANNELS, 1000),
+        ["relax", "rock", "paper", "scissors"],
+        window=500,
+        step=250,
+        scaler=joblib.load("model_2/feature_scaler.pkl"),
+    )
+    print(load_bundle("model_2/emg_mlp.bundle").describe())
+    # ... and the KNN of rock_paper_scissor.ipynb
+    print(load_bundle(bundle_legacy_knn()).describe())
@@ -0,0 +1,370 @@
+"""
+Parallel search over window size, feature subset and classifier settings.
+
+For every window/step the 17 EMG features of all recordings are computed
+once (through parallel_features / the feature cache, so a rerun does not
+load a single file); feature subsets are column selections of those.
+Every (window, subset, model) candidate is cross-validated in a process
+pool with grouped folds:
+
+    recording  whole recordings are held out, at least one per gesture in
+               every test fold (default; needs 2+ recordings per gesture)
+    blocks     each recording is cut into contiguous blocks, windows that
+               overlap the next block are dropped, and a block is never
+               split between train and test. Train and test then share
+               sessions (same electrode placement, same day), so the
+               accuracy is optimistic for a new session
+
+The result is a table of accuracy against inference cost per window
+(feature extraction + model, measured on the compiled NumPy models), and
+the cheapest candidate that reaches --target:
+
+    python model_search.py --target 0.9
+    python model_search.py --store  # every labelled recording of the dataset store
+    python model_search.py --windows 250:125 500:250 --models mlp:64,32 knn:5 --save model_2/search.bundle
+"""
+
+import argparse
+import glob
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import NamedTuple
+
+import numpy as np
+from sklearn.model_selection import StratifiedGroupKFold
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.neural_network import MLPClassifier
+from sklearn.preprocessing import StandardScaler
+
+from compiled_models import CompiledKNN, CompiledMLP, knn_arrays, mlp_arrays
+from dataset_store import GESTURES, STORE_DIR, DatasetStore, parse_name
+from feature_registry import EMG_CHANNELS, EMG_FEATURES, FeatureExtractor
+from parallel_features import FeatureJob, pool_context, extract_recordings
+
+FS = 1000
+SOURCES = "min_data/*.h5"
+CHANNELS = {"flexor": "CH2", "extensor": "CH4"}
+N_FOLDS = 5
+
+# (window, step) in samples
+WINDOWS = [(250, 125), (500, 250), (750, 375), (1000, 500)]
+# Masks over EMG_FEATURES
+_SPECTRAL = {"spectral_centroid", "spectral_entropy"}
+FEATURE_SUBSETS = {
+    "all": [True] * len(EMG_FEATURES),
+    "no_spectral": [name not in _SPECTRAL for name, _ in EMG_FEATURES],
+    "amplitude": [name in ("std", "max", "std_abs", "wl", "std_ratio") for name, _ in EMG_FEATURES],
+}
+MODELS = [
+    ("mlp", {"hidden_layer_sizes": (32,)}),
+    ("mlp", {"hidden_layer_sizes": (64, 32)}),
+    ("mlp", {"hidden_layer_sizes": (128, 64)}),
+    ("knn", {"n_neighbors": 3}),
+    ("knn", {"n_neighbors": 5}),
+    ("knn", {"n_neighbors": 9}),
+]
+
+
+class Candidate(NamedTuple):
+    window: int
+    step: int
+    subset: str
+    kind: str  # "mlp" / "knn"
+    params: dict
+
+    def label(self):
+        params = ",".join(
+            f"{v}" if not isinstance(v, tuple) else "x".join(map(str, v))
+            for v in self.params.values()
+        )
+        return f"{self.window}/{self.step} {self.subset} {self.kind}({params})"
+
+
+class Result(NamedTuple):
+    candidate: Candidate
+    accuracy: float
+    accuracy_std: float
+    n_features: int
+    features_us: float  # feature extraction per window
+    model_us: float  # normalisation + model per window
+    fit_secs: float
+
+    @property
+    def cost_us(self):
+        return self.features_us + self.model_us
+
+
+# --------------------------
+# Data
+# --------------------------
+def load_dataset(source, window, step, workers=None):
+    """
+    (X, y, recording, position) of all windows. source: recording paths
+    (features from the cache where possible) or a DatasetStore, of which
+    every row with a gesture label is used.
+    """
+    extractor = FeatureExtractor(EMG_FEATURES, EMG_CHANNELS, FS)
+    if isinstance(source, DatasetStore):
+        rows = source.select(label=list(range(len(GESTURES))), fs=FS)
+        X, y, recording = source.features(extractor, rows, CHANNELS, window, step)
+        # recording is sorted: a window's position is its offset from the first of its recording
+        position = np.arange(len(y)) - np.searchsorted(recording, recording)
+        return X, y, recording, position
+
+    paths = source
+    labelled = [(p, parse_name(p)[0]) for p in paths]
+    labelled = [(p, g) for p, g in labelled if g in GESTURES]
+    jobs = [FeatureJob(p, CHANNELS, extractor, window, step) for p, _ in labelled]
+    features = extract_recordings(jobs, workers=workers, verbose=False)
+    X, y, recording, position = [], [], [], []
+    for i, ((_, gesture), feats) in enumerate(zip(labelled, features)):
+        n = len(feats)
+        X.append(np.asarray(feats))
+        y.append(np.full(n, GESTURES.index(gesture)))
+        recording.append(np.full(n, i))
+        position.append(np.arange(n))
+    return np.concatenate(X), np.concatenate(y), np.concatenate(recording), np.concatenate(position)
+
+
+def cv_folds(y, recording, position, window, step, groups="recording", n_folds=N_FOLDS):
+    """List of (train, test) index arrays; no test window overlaps a training window."""
+    if groups == "recording":
+        # Every test fold holds out whole recordings of every gesture, so
+        # there are at most as many folds as recordings of the rarest gesture
+        per_class = [len(np.unique(recording[y == c])) for c in np.unique(y)]
+        n_splits = min(n_folds, min(per_class))
+        if n_splits < 2:
+            raise ValueError(
+                "Grouping by recording needs at least 2 recordings per gesture; "
+                "use groups='blocks'"
+            )
+        return list(StratifiedGroupKFold(n_splits).split(y, y, recording))
+
+    # Contiguous blocks per recording; the windows that overlap the next
+    # block (ceil(window / step) - 1 of them) are left out
+    purge = math.ceil(window / step) - 1
+    keep = np.ones(len(y), dtype=bool)
+    block = np.zeros(len(y), dtype=int)
+    for rec in np.unique(recording):
+        idx = np.flatnonzero(recording == rec)
+        n = len(idx)
+        edges = np.linspace(0, n, n_folds + 1).astype(int)
+        b = np.searchsorted(edges, position[idx], side="right") - 1
+        block[idx] = rec * n_folds + b
+        keep[idx] = position[idx] < edges[b + 1] - purge
+    kept = np.flatnonzero(keep)
+    splitter = StratifiedGroupKFold(n_folds)
+    return [
+        (kept[tr], kept[te]) for tr, te in splitter.split(np.zeros(len(kept)), y[kept], block[kept])
+    ]
+
+
+# --------------------------
+# Models
+# --------------------------
+def fit_model(kind, params, X, y):
+    """Fitted (model, scaler, max_per_feature) as the trainers build them."""
+    if kind == "mlp":
+        scaler = StandardScaler().fit(X)
+        model = MLPClassifier(
+            activation="relu", solver="adam", max_iter=500, random_state=1, **params
+        ).fit(scaler.transform(X), y)
+        return model, scaler, None
+    max_per_feature = np.max(X, axis=0)
+    model = KNeighborsClassifier(**params).fit(X / (max_per_feature + 1e-12), y)
+    return model, None, max_per_feature
+
+
+def compiled(kind, model, scaler, max_per_feature):
+    """predict_one(feats) of the NumPy model, including the normalisation."""
+    if kind == "mlp":
+        mlp = CompiledMLP(mlp_arrays(model, scaler))
+        return lambda x: mlp.predict_one(x)
+    knn = CompiledKNN(knn_arrays(model))
+    scale = max_per_feature + 1e-12
+    return lambda x: knn.predict_one(np.asarray(x, dtype=float) / scale)
+
+
+def _evaluate(candidate, X, y, train, test):
+    t0 = time.time()
+    model, scaler, max_per_feature = fit_model(candidate.kind, candidate.params, X[train], y[train])
+    fit_secs = time.time() - t0
+    predict = compiled(candidate.kind, model, scaler, max_per_feature)
+    pred = np.array([predict(x) for x in X[test]])
+    return float(np.mean(pred == y[test])), fit_secs, (model, scaler, max_per_feature)
+
+
+def _time_us(func, *args, repeat=200):
+    func(*args)
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - t0)
+    return 1e6 * float(np.median(times))
+
+
+# --------------------------
+# Search
+# --------------------------
+def search(
+    source,
+    windows=WINDOWS,
+    subsets=FEATURE_SUBSETS,
+    models=MODELS,
+    groups="recording",
+    n_folds=N_FOLDS,
+    workers=None,
+    verbose=True,
+):
+    """
+    Cross-validated Result per candidate, sorted by inference cost. source:
+    recording paths or a DatasetStore (see load_dataset()).
+    """
+    workers = workers or os.cpu_count() or 1
+    data, folds, candidates = {}, {}, []
+    for window, step in windows:
+        X, y, recording, position = load_dataset(source, window, step, workers)
+        data[window, step] = X, y
+        folds[window, step] = cv_folds(y, recording, position, window, step, groups, n_folds)
+        for subset in subsets:
+            for kind, params in models:
+                candidates.append(Candidate(window, step, subset, kind, dict(params)))
+        if verbose:
+            print(f"✅ {window}/{step}: {len(y)} windows, {len(folds[window, step])} folds")
+
+    accuracies = {c: [] for c in range(len(candidates))}
+    fit_secs = {c: 0.0 for c in range(len(candidates))}
+    fitted = {}
+    t0 = time.time()
+    with ProcessPoolExecutor(workers, mp_context=pool_context()) as pool:
+        futures = {}
+        for c, cand in enumerate(candidates):
+            X, y = data[cand.window, cand.step]
+            Xs = X[:, np.asarray(subsets[cand.subset], dtype=bool)]
+            for f, (train, test) in enumerate(folds[cand.window, cand.step]):
+                futures[pool.submit(_evaluate, cand, Xs, y, train, test)] = (c, f)
+        for done, future in enumerate(as_completed(futures), 1):
+            c, f = futures[future]
+            acc, secs, model = future.result()
+            accuracies[c].append(acc)
+            fit_secs[c] += secs
+            if f == 0:
+                fitted[c] = model
+            if verbose and (done % 50 == 0 or done == len(futures)):
+                print(f"[{done}/{len(futures)}] fits done ({time.time() - t0:.1f} s)")
+
+    # Inference cost, measured here one candidate at a time
+    results, feature_us = [], {}
+    for c, cand in enumerate(candidates):
+        X, _ = data[cand.window, cand.step]
+        mask = np.asarray(subsets[cand.subset], dtype=bool)
+        key = (cand.window, cand.subset)
+        if key not in feature_us:
+            extractor = FeatureExtractor(EMG_FEATURES, EMG_CHANNELS, FS, mask=mask)
+            raw = {ch: np.random.default_rng(0).integers(0, 1024, cand.window) for ch in EMG_CHANNELS}
+            feature_us[key] = _time_us(extractor.extract, raw, repeat=50)
+        predict = compiled(cand.kind, *fitted[c])
+        results.append(
+            Result(
+                cand,
+                float(np.mean(accuracies[c])),
+                float(np.std(accuracies[c])),
+                int(mask.sum()),
+                feature_us[key],
+                _time_us(predict, X[0, mask]),
+                fit_secs[c],
+            )
+        )
+    return sorted(results, key=lambda r: r.cost_us)
+
+
+def cheapest(results, target):
+    """Cheapest Result with mean accuracy >= target (None if there is none)."""
+    good = [r for r in results if r.accuracy >= target]
+    return min(good, key=lambda r: r.cost_us) if good else None
+
+
+def report(results, target=None):
+    lines = [
+        f"{'candidate':<42} {'feats':>5} {'acc':>6} {'±':>5} {'feat µs':>8} "
+        f"{'model µs':>8} {'total µs':>8} {'fit s':>6}"
+    ]
+    best = cheapest(results, target) if target is not None else None
+    for r in results:
+        mark = " ←" if r is best else ""
+        lines.append(
+            f"{r.candidate.label():<42} {r.n_features:>5} {r.accuracy:>6.3f} {r.accuracy_std:>5.3f} "
+            f"{r.features_us:>8.0f} {r.model_us:>8.0f} {r.cost_us:>8.0f} {r.fit_secs:>6.1f}{mark}"
+        )
+    if target is not None:
+        lines.append(
+            f"Cheapest with accuracy >= {target}: {best.candidate.label()}"
+            if best
+            else f"⚠️ No candidate reaches accuracy {target}"
+        )
+    return "\n".join(lines)
+
+
+def save_candidate(path, candidate, source, subsets=FEATURE_SUBSETS):
+    """Train `candidate` on all windows and save it as a model bundle."""
+    from model_bundle import save_bundle
+
+    X, y, _, _ = load_dataset(source, candidate.window, candidate.step)
+    mask = np.asarray(subsets[candidate.subset], dtype=bool)
+    model, scaler, max_per_feature = fit_model(candidate.kind, candidate.params, X[:, mask], y)
+    if max_per_feature is not None:
+        full = np.max(X, axis=0)
+        full[mask] = max_per_feature
+        max_per_feature = full
+    return save_bundle(
+        path,
+        model,
+        FeatureExtractor(EMG_FEATURES, EMG_CHANNELS, FS, mask=mask),
+        GESTURES,
+        window=candidate.window,
+        step=candidate.step,
+        scaler=scaler,
+        max_per_feature=max_per_feature,
+    )
+
+
+def _parse_model(text):
+    kind, _, value = text.partition(":")
+    if kind == "mlp":
+        return kind, {"hidden_layer_sizes": tuple(int(v) for v in value.split(","))}
+    if kind == "knn":
+        return kind, {"n_neighbors": int(value)}
+    raise argparse.ArgumentTypeError(f"Unknown model {text!r} (mlp:64,32 / knn:5)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-validated window / feature / model search")
+    parser.add_argument("--sources", default=SOURCES, help="glob of the training recordings")
+    parser.add_argument(
+        "--store", nargs="?", const=STORE_DIR, help="train on a dataset store (dataset_store.py) instead"
+    )
+    parser.add_argument("--windows", nargs="+", help="window:step in samples, e.g. 500:250")
+    parser.add_argument("--subsets", nargs="+", choices=sorted(FEATURE_SUBSETS))
+    parser.add_argument("--models", nargs="+", type=_parse_model, help="mlp:64,32 / knn:5")
+    parser.add_argument("--groups", default="recording", choices=["recording", "blocks"])
+    parser.add_argument("--folds", type=int, default=N_FOLDS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--target", type=float, default=0.9, help="accuracy bar")
+    parser.add_argument("--save", help="train the cheapest candidate on all data and bundle it here")
+    args = parser.parse_args()
+
+    source = DatasetStore(args.store) if args.store else sorted(glob.glob(args.sources))
+    windows = [tuple(int(v) for v in w.split(":")) for w in args.windows] if args.windows else WINDOWS
+    subsets = {s: FEATURE_SUBSETS[s] for s in args.subsets} if args.subsets else FEATURE_SUBSETS
+    t0 = time.time()
+    results = search(
+        source, windows, subsets, args.models or MODELS, args.groups, args.folds, args.workers
+    )
+    print(f"\n{len(source)} recordings, {len(results)} candidates in {time.time() - t0:.1f} s\n")
+    print(report(results, args.target))
+    best = cheapest(results, args.target)
+    if args.save and best:
+        save_candidate(args.save, best.candidate, source, subsets)
@@ -0,0 +1,216 @@
+"""
+Read several BITalinos at once and put them on one time base.
+
+Every device gets its own AcquisitionThread and RingBuffer, so the reads run
+in parallel. Each device's sample counter is regressed against host time
+(AcquisitionThread.clock) to estimate when its sample 0 was taken (offset)
+and how fast its clock really runs (drift vs. the nominal rate). aligned()
+then resamples all streams onto a common host-time grid, so a fused
+consumer sees one frame per time step from every device.
+
+    python multi_device.py --eeg 98:D3:11:FE:02:74 --emg 98:D3:11:FE:02:75 --ecg 98:D3:11:FE:02:76
+
+Lost frames are interpolated (fill="interp") so a device's sample counter
+stays proportional to its own clock.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from acquisition import AcquisitionThread, analog_columns
+from device_source import open_device
+from ring_buffer import RingBuffer
+
+CLOCK_FIT_SECS = 30  # regression window for offset/drift
+
+
+class DeviceClock:
+    """Linear map between a device's sample index and host time."""
+
+    def __init__(self, fs):
+        self.fs = fs
+        self.t0 = None  # host time of sample 0
+        self.period = 1.0 / fs  # measured seconds per sample
+        self.residual = 0.0  # rms jitter of the read times around the fit (s)
+
+    def fit(self, clock):
+        """Update from (host time, samples so far) pairs."""
+        if not clock:
+            return
+        t, n = np.array(clock, dtype=float).T
+        keep = t >= t[-1] - CLOCK_FIT_SECS
+        t, n = t[keep], n[keep]
+        if len(t) >= 10 and n[-1] > n[0]:
+            period, t0 = np.polyfit(n, t, 1)
+            self.period, self.t0 = period, t0
+            self.residual = float(np.sqrt(np.mean((t - (t0 + period * n)) ** 2)))
+        else:
+            self.t0 = t[-1] - n[-1] * self.period
+
+    @property
+    def drift_ppm(self) -> float:
+        """How much slower (+) or faster (-) than nominal the device clock runs."""
+        return (self.period * self.fs - 1.0) * 1e6
+
+    def time_of(self, index):
+        return self.t0 + self.period * np.asarray(index, dtype=float)
+
+    def index_at(self, t):
+        return (np.asarray(t, dtype=float) - self.t0) / self.period
+
+
+class MultiDeviceAcquisition:
+    """
+    Parallel acquisition from several devices.
+
+    streams: {name: (mac, fs, channels)}; channels are 0-based as for
+    device.start(). `transforms` can map a stream name to a function of the
+    raw read() result (default: the analog columns).
+    """
+
+    def __init__(self, streams, n_samples=50, history_secs=10, transforms=None):
+        transforms = transforms or {}
+        self.names = list(streams)
+        self.fs = {}
+        self.devices = {}
+        self.buffers = {}
+        self.threads = {}
+        self.clocks = {}
+        for name, (mac, fs, channels) in streams.items():
+            print(f"Connecting {name} to {mac} ...")
+            device = open_device(mac)
+            device.start(fs, channels)
+            buffer = RingBuffer((history_secs + 1) * fs, len(channels))
+            self.fs[name] = fs
+            self.devices[name] = device
+            self.buffers[name] = buffer
+            self.clocks[name] = DeviceClock(fs)
+            self.threads[name] = AcquisitionThread(
+                device,
+                max(1, n_samples * fs // 1000),
+                buffer,
+                transform=transforms.get(name, analog_columns),
+                fs=fs,
+                fill="interp",
+                name=f"acquisition-{name}",
+            )
+        self.history_secs = history_secs
+
+    def start(self):
+        # Devices are started in __init__, so only the readers are left to start
+        for thread in self.threads.values():
+            thread.start()
+        print(f"✅ Reading {', '.join(self.names)} in parallel")
+
+    def update_clocks(self):
+        for name in self.names:
+            self.clocks[name].fit(self.threads[name].clock)
+        return self.clocks
+
+    def offsets(self):
+        """Start time of every stream relative to the first one (seconds)."""
+        self.update_clocks()
+        ref = self.clocks[self.names[0]].t0
+        return {name: self.clocks[name].t0 - ref for name in self.names}
+
+    def aligned(self, seconds, fs=None):
+        """
+        Last `seconds` of all streams on one host-time grid.
+
+        Returns (t, {name: array of shape (n, channels)}) where t is host
+        time (time.perf_counter()) and n = seconds * fs. The grid ends at the
+        newest instant every device has delivered; fs defaults to the highest
+        device rate.
+        """
+        self.update_clocks()
+        fs = fs or max(self.fs.values())
+        totals = {name: self.buffers[name].total for name in self.names}
+        histories = {
+            name: self.buffers[name].latest(end=totals[name]) for name in self.names
+        }
+        t_end = min(self.clocks[name].time_of(totals[name] - 1) for name in self.names)
+        t_start = max(
+            self.clocks[name].time_of(totals[name] - len(histories[name]))
+            for name in self.names
+        )
+        n = max(0, int(min(seconds, t_end - t_start) * fs))
+        t = t_end - np.arange(n)[::-1] / fs
+
+        frames = {}
+        for name, history in histories.items():
+            idx = self.clocks[name].index_at(t) - (totals[name] - len(history))
+            pos = np.arange(len(history))
+            frames[name] = np.zeros((n, history.shape[1]))
+            for c in range(history.shape[1]):
+                frames[name][:, c] = np.interp(idx, pos, history[:, c])
+        return t, frames
+
+    def stats_text(self):
+        self.update_clocks()
+        lines = []
+        for name in self.names:
+            clock = self.clocks[name]
+            lines.append(
+                f"{name}: drift {clock.drift_ppm:+.0f} ppm, jitter {1000 * clock.residual:.2f} ms | "
+                + self.threads[name].status_text()
+            )
+        return "\n".join(lines)
+
+    def close(self):
+        for name in self.names:
+            self.threads[name].stop()
+        for name in self.names:
+            try:
+                self.devices[name].stop()
+                self.devices[name].close()
+            except Exception as e:
+                print(f"⚠️ Error closing {name}:", e)
+        print("BITalino connections closed.")
+
+
+# --------------------------
+# Fused EEG blink + EMG ratio + ECG demo
+# --------------------------
+if __name__ == "__main__":
+    from conversion import adc_to_microvolt
+    from ecg_utils import compute_heart_rate
+
+    parser = argparse.ArgumentParser(description="Synchronized EEG + EMG + ECG acquisition")
+    parser.add_argument("--eeg", default="98:D3:11:FE:02:74", help="MAC of the EEG device (A1)")
+    parser.add_argument("--emg", default=None, help="MAC of the EMG device (A2 flexor, A4 extensor)")
+    parser.add_argument("--ecg", default=None, help="MAC of the ECG device (A2)")
+    parser.add_argument("--secs", type=float, default=5.0, help="fused window length")
+    args = parser.parse_args()
+
+    streams = {"eeg": (args.eeg, 1000, [0])}
+    if args.emg:
+        streams["emg"] = (args.emg, 1000, [1, 3])
+    if args.ecg:
+        streams["ecg"] = (args.ecg, 100, [1])
+
+    acq = MultiDeviceAcquisition(streams)
+    acq.start()
+    try:
+        while True:
+            time.sleep(1.0)
+            t, frames = acq.aligned(args.secs, fs=100)
+            if not len(t):
+                continue
+            # Same µV conversion and threshold as EEGBlinkInput
+            eeg_uv = np.abs(adc_to_microvolt(frames["eeg"][:, 0]))
+            line = f"EEG blink {'yes' if eeg_uv[-100:].min() < 35 else 'no '}"
+            if "emg" in frames:
+                flex, ext = frames["emg"].std(axis=0)
+                line += f" | EMG ratio {(flex + 1e-6) / (ext + 1e-6):.2f}"
+            if "ecg" in frames:
+                # Same inversion and detector as live_heartrate.py
+                bpm, _ = compute_heart_rate(-frames["ecg"][:, 0], 100)
+                line += f" | HR {bpm:.0f} BPM"
+            print(line)
+            print(acq.stats_text())
+    except KeyboardInterrupt:
+        print("Interrupted by user.")
+    finally:
+        acq.close()
@@ -0,0 +1,109 @@
+"""
+Feature extraction for many recordings on all cores.
+
+Every recording is independent, so extract_recordings() fans the ones that
+are not in the feature cache out over a process pool (each worker loads,
+extracts and caches one recording) and returns the results in job order,
+whatever order the workers finish in. Cached recordings are read in the
+main process without touching the pool.
+
+    jobs = [FeatureJob(path, {"flexor": "CH2", "extensor": "CH4"}, extractor, 500, 250)
+            for path in glob.glob("min_data/*.h5")]
+    features = extract_recordings(jobs, workers=4)  # list of (n_windows, 17)
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+import feature_cache
+
+
+class FeatureJob(NamedTuple):
+    path: str
+    channels: dict  # {extractor channel: channel label in the file}
+    extractor: object  # feature_registry.FeatureExtractor
+    window: Optional[int] = None  # None: one vector for the whole recording
+    step: Optional[int] = None
+    start: int = 0
+
+
+def _run(job):
+    t0 = time.time()
+    features = np.asarray(feature_cache.cached_features(*job))
+    return features, time.time() - t0
+
+
+def pool_context():
+    """
+    Multiprocessing context for worker pools: fork where available, as the
+    training scripts run at module level without a __main__ guard and a
+    spawned worker would re-import the whole script.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+
+def _n_vectors(features):
+    return len(features) if features.ndim > 1 else 1
+
+
+def extract_recordings(jobs, workers=None, verbose=True):
+    """
+    feature_cache.cached_features(*job) for every job, in job order.
+
+    workers: pool size (None = all cores, 1 = no pool).
+    verbose: print progress (at most once a second) and a throughput summary.
+    """
+    jobs = [FeatureJob(*job) for job in jobs]
+    results = [None] * len(jobs)
+    todo = []
+    for i, job in enumerate(jobs):
+        results[i] = feature_cache.lookup(*job)
+        if results[i] is None:
+            todo.append(i)
+
+    workers = min(workers or os.cpu_count() or 1, max(len(todo), 1))
+    t0 = time.time()
+
+    last_report = [t0]
+
+    def report(done, i, features, secs):
+        # At most one progress line per second, plus the last recording
+        now = time.time()
+        if verbose and (done == len(todo) or now - last_report[0] >= 1.0):
+            last_report[0] = now
+            name = os.path.basename(jobs[i].path)
+            print(
+                f"[{done}/{len(todo)}] {name}: {_n_vectors(features)} feature vectors "
+                f"in {secs:.2f} s ({now - t0:.1f} s elapsed)"
+            )
+
+    if workers == 1:
+        for done, i in enumerate(todo, 1):
+            results[i], secs = _run(jobs[i])
+            report(done, i, results[i], secs)
+    else:
+        with ProcessPoolExecutor(workers, mp_context=pool_context()) as pool:
+            futures = {pool.submit(_run, jobs[i]): i for i in todo}
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                results[i], secs = future.result()
+                report(done, i, results[i], secs)
+        feature_cache.stats["misses"] += len(todo)
+
+    if verbose:
+        elapsed = time.time() - t0
+        vectors = sum(_n_vectors(results[i]) for i in todo)
+        rate = vectors / elapsed if elapsed > 0 else float("inf")
+        print(
+            f"✅ {len(jobs)} recordings ({len(jobs) - len(todo)} cached), "
+            f"{vectors} feature vectors computed in {elapsed:.2f} s "
+            f"({rate:.0f}/s, {workers} worker{'s' if workers > 1 else ''})"
+        )
+    return results
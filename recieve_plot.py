@@ -1,12 +1,15 @@
 import time
 import sys
 import numpy as np
-from collections import deque
 
-from bitalino import BITalino
+from device_source import open_device
 import pyqtgraph as pg
 from pyqtgraph.Qt import QtWidgets, QtCore
 
+from acquisition import AcquisitionThread
+from recorder import recorder_from_env
+from ring_buffer import RingBuffer
+
 
 
 # --------------------------
@@ -22,7 +25,7 @@ samplingRate = 1000  # Hz
 nSamples = 100
 
 print(f"Connecting to BITalino device {macAddress} ...")
-device = BITalino(macAddress)
+device = open_device(macAddress)
 device.battery(batteryThreshold)
 
 print("Connected.")
@@ -39,15 +42,16 @@ app = QtWidgets.QApplication([])
 pg.setConfigOptions(antialias=True)
 win = pg.GraphicsLayoutWidget(show=True, title="BITalino Live Stream (10s Window)")
 win.resize(1000, 800)
-win.setWindowTitle("Real-Time BITalino Viewer")
+TITLE = "Real-Time BITalino Viewer"
+win.setWindowTitle(TITLE)
 
 plots, curves = [], []
 history_secs = 10
 max_samples = samplingRate * history_secs
 
-data = [deque(maxlen=max_samples) for _ in acqChannels]
-x_axis = deque(maxlen=max_samples)
-sample_counter = 0
+# 1 s headroom so the acquisition thread never overwrites what is being drawn
+buffer = RingBuffer(max_samples + samplingRate, len(acqChannels))
+last_total = 0
 
 for i, ch in enumerate(acqChannels):
     p = win.addPlot(row=i, col=0)
@@ -66,26 +70,30 @@ for i, ch in enumerate(acqChannels):
 # --------------------------
 start_time = time.time()
 
+# Device reads run in their own thread; the timer only renders what arrived
+# Lost frames are inserted as NaN so they show up as breaks in the traces
+recorder = recorder_from_env(samplingRate, acqChannels, "raw")
+acquisition = AcquisitionThread(
+    device, nSamples, buffer, fs=samplingRate, fill="nan", recorder=recorder
+)  # columns A1–A6
+acquisition.start()
+
 
 def update():
-    global sample_counter
+    global last_total
     try:
-        samples = device.read(nSamples)
-        analog = samples[:, 5:].astype(float)  # columns A1–A6
+        total = buffer.total
+        if total == last_total:
+            return
+        last_total = total
+        analog = buffer.latest(max_samples, end=total)
 
-        # Compute time values for this batch
-        t_values = np.arange(sample_counter, sample_counter + nSamples) / samplingRate
-        sample_counter += nSamples
-
-        # Append time values (extend instead of append)
-        x_axis.extend(t_values)
+        # Time values of the samples on screen
+        t_values = (total - len(analog) + np.arange(len(analog))) / samplingRate
 
         # Update each channel plot
         for j, ch in enumerate(acqChannels):
-            data[j].extend(analog[:, ch])
-            # Ensure matching lengths
-            min_len = min(len(x_axis), len(data[j]))
-            curves[j].setData(list(x_axis)[-min_len:], list(data[j])[-min_len:])
+            curves[j].setData(t_values, analog[:, j], connect="finite")
             plots[j].setXRange(max(0, t_values[-1] - history_secs), t_values[-1])
 
     except Exception as e:
@@ -97,6 +105,13 @@ timer = QtCore.QTimer()
 timer.timeout.connect(update)
 timer.start(10)  # ms → update ~100 Hz (draw loop, not sampling)
 
+# Lost frames / overruns in the title bar, refreshed once per second
+status_timer = QtCore.QTimer()
+status_timer.timeout.connect(
+    lambda: win.setWindowTitle(f"{TITLE} | {acquisition.status_text()}")
+)
+status_timer.start(1000)
+
 # --------------------------
 # 4. Run the event loop
 # --------------------------
@@ -105,6 +120,10 @@ try:
 except KeyboardInterrupt:
     print("Interrupted by user.")
 finally:
+    acquisition.stop()
+    print("Acquisition:", acquisition.stats_text())
+    if recorder:
+        recorder.close()
     device.stop()
     device.close()
     print("BITalino connection closed.")
@@ -0,0 +1,229 @@
+"""
+Background recorder for live sessions.
+
+StreamRecorder appends raw device.read() chunks to an OpenSignals-style .h5
+file (same layout as the files in min_data/), so recordings can be loaded
+with bsnb.load() and used by the training scripts directly. Predictions and
+game events go into <mac>/annotations as (sample, time, label) rows.
+
+write() and annotate() only put items into a bounded queue and never
+block; a writer thread batches them into the file and fsyncs every few
+seconds. If the queue is full the chunk is dropped and counted instead of
+stalling the caller.
+
+Set BITALINO_RECORD to a folder or .h5 path to record any live tool.
+"""
+
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+class StreamRecorder:
+    def __init__(
+        self,
+        path,
+        fs,
+        channels,
+        mac="00:00:00:00:00:00",
+        max_queue_chunks=2000,
+        flush_secs=2.0,
+        sensors=None,
+    ):
+        import h5py
+
+        self.path = path
+        self.fs = fs
+        self.channels = sorted(set(channels))
+        self.flush_secs = flush_secs
+        self.queue = queue.Queue(maxsize=max_queue_chunks)
+        self.frames_in = 0
+        self.frames_written = 0
+        self.dropped_chunks = 0
+        self.t0 = time.perf_counter()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.file = h5py.File(path, "w")
+        dev = self.file.create_group(mac)
+        now = time.localtime()
+        dev.attrs.update(
+            {
+                "channels": np.array([ch + 1 for ch in self.channels]),
+                "sampling rate": fs,
+                "resolution": np.array(
+                    [4, 1, 1, 1, 1] + [10 if ch < 4 else 6 for ch in self.channels]
+                ),
+                "device": "bitalino_rev",
+                "device name": mac,
+                "device connection": mac,
+                "macaddress": mac,
+                "date": time.strftime("%Y-%m-%d", now),
+                "time": time.strftime("%H:%M:%S", now) + ".000",
+                "digital IO": np.array([0, 0, 1, 1]),
+                "firmware version": 0,
+                "sync interval": 2,
+                "mode": 0,
+                "comments": "recorded live by recorder.py",
+                "keywords": "",
+                "nsamples": 0,
+            }
+        )
+
+        def series(group, name, dtype):
+            return group.create_dataset(
+                name, shape=(0, 1), maxshape=(None, 1), dtype=dtype, chunks=(4096, 1)
+            )
+
+        raw = dev.create_group("raw")
+        digital = dev.create_group("digital")
+        self._columns = [series(raw, "nSeq", "<i4")]
+        self._columns += [series(digital, f"digital_{i}", "<u2") for i in range(1, 5)]
+        for i, ch in enumerate(self.channels):
+            ds = series(raw, f"channel_{ch + 1}", "<u4")
+            ds.attrs["label"] = f"A{ch + 1}"
+            ds.attrs["sensor"] = sensors[i] if sensors else "RAW"
+            ds.attrs["special"] = "{}"
+            self._columns.append(ds)
+
+        notes = dev.create_group("annotations")
+        self._note_sample = notes.create_dataset(
+            "sample", shape=(0,), maxshape=(None,), dtype="<i8", chunks=(256,)
+        )
+        self._note_time = notes.create_dataset(
+            "time", shape=(0,), maxshape=(None,), dtype="<f8", chunks=(256,)
+        )
+        self._note_label = notes.create_dataset(
+            "label",
+            shape=(0,),
+            maxshape=(None,),
+            dtype=h5py.string_dtype(),
+            chunks=(256,),
+        )
+        self._dev = dev
+
+        self._thread = threading.Thread(target=self._writer, name="recorder", daemon=True)
+        self._thread.start()
+        print(f"⏺️ Recording to {path}")
+
+    # --- called from the acquisition / GUI threads ---
+    def write(self, samples):
+        """Queue a device.read() result (all columns). Never blocks."""
+        try:
+            self.queue.put_nowait(("data", np.array(samples, copy=True)))
+            self.frames_in += len(samples)
+        except queue.Full:
+            self.dropped_chunks += 1
+
+    def annotate(self, label, sample=None):
+        """Queue an annotation at `sample` (default: the newest recorded frame)."""
+        if sample is None:
+            sample = self.frames_in
+        item = ("note", (sample, time.perf_counter() - self.t0, str(label)))
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.dropped_chunks += 1
+
+    def close(self, timeout=10.0):
+        """Stop the writer and wait up to `timeout` s for it to finish the file."""
+        if self._thread.is_alive():
+            try:
+                self.queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+        if self._thread.is_alive():
+            print(f"⚠️ Recorder did not finish writing {self.path} in {timeout:.0f}s")
+            return
+        print(
+            f"⏹️ Saved {self.frames_written} frames to {self.path}"
+            + (f" ({self.dropped_chunks} chunks dropped)" if self.dropped_chunks else "")
+        )
+
+    # --- writer thread ---
+    def _writer(self):
+        last_flush = time.perf_counter()
+        running = True
+        while running:
+            try:
+                items = [self.queue.get(timeout=0.2)]
+            except queue.Empty:
+                items = []
+            # Drain whatever else is waiting so it goes to disk as one batch
+            while True:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in items:
+                running = False
+                items = [item for item in items if item is not None]
+
+            chunks = [payload for kind, payload in items if kind == "data"]
+            notes = [payload for kind, payload in items if kind == "note"]
+            if chunks:
+                self._append_frames(np.concatenate(chunks))
+            if notes:
+                self._append_notes(notes)
+
+            if not running or time.perf_counter() - last_flush > self.flush_secs:
+                self._sync()
+                last_flush = time.perf_counter()
+        self.file.close()
+
+    def _append_frames(self, frames):
+        n0, n = self.frames_written, len(frames)
+        for col, ds in enumerate(self._columns):
+            ds.resize((n0 + n, 1))
+            ds[n0:] = frames[:, col : col + 1]
+        self.frames_written += n
+        self._dev.attrs["nsamples"] = self.frames_written
+        self._dev.attrs["duration"] = f"{self.frames_written / self.fs:.1f}s"
+
+    def _append_notes(self, notes):
+        n0, n = self._note_sample.shape[0], len(notes)
+        samples, times, labels = zip(*notes)
+        for ds, values in (
+            (self._note_sample, samples),
+            (self._note_time, times),
+            (self._note_label, labels),
+        ):
+            ds.resize((n0 + n,))
+            ds[n0:] = values
+
+    def _sync(self):
+        self.file.flush()
+        try:
+            os.fsync(self.file.id.get_vfd_handle())
+        except Exception:
+            pass
+
+
+def recorder_from_env(fs, channels, name="session", sensors=None):
+    """StreamRecorder if BITALINO_RECORD is set, else None.
+
+    sensors: OpenSignals sensor names per channel (e.g. "EMGBITREV"), so
+    bsnb.raw_to_phy() knows what was recorded.
+    """
+    target = os.environ.get("BITALINO_RECORD")
+    if not target:
+        return None
+    if not target.endswith(".h5"):
+        target = os.path.join(target, f"{name}_{time.strftime('%Y-%m-%d_%H-%M-%S')}.h5")
+    return StreamRecorder(target, fs, channels, sensors=sensors)
+
+
+def load_annotations(path):
+    """Return [(sample, time, label), ...] stored by StreamRecorder."""
+    import h5py
+
+    with h5py.File(path, "r") as f:
+        dev = f[next(iter(f.keys()))]
+        if "annotations" not in dev:
+            return []
+        notes = dev["annotations"]
+        labels = [x.decode() if isinstance(x, bytes) else x for x in notes["label"][:]]
+        return list(zip(notes["sample"][:].tolist(), notes["time"][:].tolist(), labels))
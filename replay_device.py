@@ -0,0 +1,140 @@
+"""
+Replay OpenSignals recordings through the bitalino.BITalino interface.
+
+ReplayBITalino streams the frames of one or more .txt/.h5 recordings
+(nSeq, I1, I2, O1, O2, A1..A6) from start()/read(n)/stop()/close(), so the
+live scripts and games can run without the physical device:
+
+    BITALINO_REPLAY="min_data/*.h5" BITALINO_REPLAY_SPEED=0 python life_classification_2.py
+
+BITALINO_REPLAY_SPEED: 1 = real time (default), N = N x real time,
+0 = as fast as possible.
+"""
+
+import glob
+import os
+import time
+
+import numpy as np
+
+from opensignals import N_META_COLS, load_frames
+
+
+def expand_paths(source):
+    """Turn a file, directory, glob or list of those into a sorted file list."""
+    if isinstance(source, (list, tuple)):
+        return [p for item in source for p in expand_paths(item)]
+    if os.path.isdir(source):
+        source = os.path.join(source, "*")
+    paths = sorted(
+        p for p in glob.glob(source) if p.endswith(".txt") or p.endswith(".h5")
+    )
+    if not paths:
+        raise FileNotFoundError(f"No OpenSignals recordings match {source!r}")
+    return paths
+
+
+def _seq_shift(prev, frames):
+    """nSeq offset that makes `frames` continue after the frames `prev`."""
+    return (int(prev[-1, 0]) + 1 - int(frames[0, 0])) % 16
+
+
+def _join(recordings):
+    """
+    Concatenate recordings with nSeq continuing across the joins, so the
+    SequenceTracker does not count the file boundaries as lost frames.
+    Gaps inside a recording are kept.
+    """
+    out = []
+    for frames in recordings:
+        frames = np.array(frames)
+        if out:
+            frames[:, 0] = (frames[:, 0] + _seq_shift(out[-1], frames)) % 16
+        out.append(frames)
+    return np.concatenate(out)
+
+
+class ReplayBITalino:
+    """Simulated BITalino that plays back recorded sessions."""
+
+    def __init__(self, source, speed=1.0, loop=True):
+        self.paths = expand_paths(source)
+        self.speed = speed
+        self.loop = loop
+
+        recordings = [load_frames(p) for p in self.paths]
+        self.fs = recordings[0][1]
+        if any(fs != self.fs for _, fs, _ in recordings):
+            raise ValueError("All replayed recordings must share one sampling rate")
+        self.frames = _join(frames for frames, _, _ in recordings)
+        self.recorded_channels = sorted(
+            set.intersection(*(set(chs) for _, _, chs in recordings))
+        )
+
+        self.started = False
+        self.samples_read = 0
+        self._stream = None
+        self._loop_shift = 0
+        self._t0 = 0.0
+        print(
+            f"✅ Replaying {len(self.paths)} recording(s), "
+            f"{len(self.frames) / self.fs:.1f} s @ {self.fs} Hz"
+        )
+
+    def start(self, SamplingRate=1000, analogChannels=[0, 1, 2, 3, 4, 5]):
+        if self.started:
+            raise Exception("The device is not idle.")
+        SamplingRate = int(SamplingRate)
+        if self.fs % SamplingRate:
+            raise ValueError(f"Cannot replay {self.fs} Hz data at {SamplingRate} Hz")
+        channels = sorted(set(analogChannels))
+        missing = [ch for ch in channels if ch not in self.recorded_channels]
+        if missing:
+            raise ValueError(f"Channels {missing} are not in the replayed recordings")
+
+        step = self.fs // SamplingRate
+        columns = list(range(N_META_COLS)) + [N_META_COLS + ch for ch in channels]
+        self._stream = self.frames[::step][:, columns]
+        if step > 1:
+            # The real device numbers the frames it sends, not the ones we skipped
+            self._stream[:, 0] = np.arange(len(self._stream)) % 16
+        # When looping, every pass is shifted on so that it continues the last
+        self._loop_shift = _seq_shift(self._stream, self._stream)
+        self.rate = SamplingRate
+        self.samples_read = 0
+        self._t0 = time.perf_counter()
+        self.started = True
+
+    def read(self, nSamples=100):
+        if not self.started:
+            raise Exception("The device is not in acquisition mode.")
+        if self.speed:
+            due = self._t0 + (self.samples_read + nSamples) / (self.rate * self.speed)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        end = self.samples_read + nSamples
+        n = len(self._stream)
+        if end <= n:
+            out = self._stream[self.samples_read : end].copy()
+        elif self.loop:
+            idx = np.arange(self.samples_read, end)
+            out = self._stream[idx % n]
+            out[:, 0] = (out[:, 0] + (idx // n) * self._loop_shift) % 16
+        else:
+            raise EOFError("Replay finished")
+        self.samples_read = end
+        return out
+
+    def battery(self, value=0):
+        pass
+
+    def version(self):
+        return "replay: " + ", ".join(os.path.basename(p) for p in self.paths)
+
+    def stop(self):
+        self.started = False
+
+    def close(self):
+        self._stream = None
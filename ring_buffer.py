@@ -0,0 +1,66 @@
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Fixed-capacity multi-channel sample buffer.
+
+    Every sample is stored twice (slot and slot + capacity), so the newest
+    n samples are always one contiguous slice: latest(n) returns a view
+    instead of a copy and extend() costs O(chunk), never O(history).
+
+    `storage` (shape (2 * capacity, n_channels)) and `counter` (int64, shape
+    (1,)) can be passed in to place the buffer in shared memory.
+    """
+
+    def __init__(self, capacity, n_channels=1, dtype=float, storage=None, counter=None):
+        self.capacity = int(capacity)
+        if storage is None:
+            storage = np.zeros((2 * self.capacity, n_channels), dtype=dtype)
+        if storage.shape[0] != 2 * self.capacity:
+            raise ValueError("storage must hold 2 * capacity rows")
+        self.data = storage
+        self.n_channels = storage.shape[1]
+        self._counter = counter if counter is not None else np.zeros(1, dtype=np.int64)
+
+    @property
+    def total(self) -> int:
+        """Number of samples written since creation (monotonically increasing)."""
+        return int(self._counter[0])
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def extend(self, chunk):
+        """Append a chunk of shape (n, n_channels) or (n,) for one channel."""
+        chunk = np.asarray(chunk)
+        if chunk.ndim == 1:
+            chunk = chunk.reshape(-1, 1)
+        total = self.total
+        n_new = len(chunk)
+        chunk = chunk[-self.capacity :]
+        n = len(chunk)
+        pos = (total + n_new - n) % self.capacity
+        first = min(n, self.capacity - pos)
+        for base in (0, self.capacity):
+            self.data[base + pos : base + pos + first] = chunk[:first]
+            self.data[base : base + n - first] = chunk[first:]
+        # Publish the new count only after the data is in place
+        self._counter[0] = total + n_new
+
+    def latest(self, n=None, end=None):
+        """
+        View of the newest n samples (all of them if n is None).
+
+        `end` selects an older end point on the sample counter. The view is
+        overwritten once capacity - n further samples have been written.
+        """
+        if end is None:
+            end = self.total
+        available = min(end, self.capacity)
+        n = available if n is None else min(n, available)
+        stop = end % self.capacity + self.capacity
+        return self.data[stop - n : stop]
+
+    def clear(self):
+        self._counter[0] = 0
@@ -1,96 +1,45 @@
-import os, glob
+import os
 import numpy as np
-import biosignalsnotebooks as bsnb
-from scipy.signal import welch
-from scipy.stats import entropy
 from sklearn.neural_network import MLPClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
 import joblib
-from copy import deepcopy
 from sklearn.preprocessing import StandardScaler
 
-from feature_utils import extract_emg_features
+from dataset_store import GESTURES, STORE_DIR, DatasetStore, build_store
+from feature_registry import EMG_CHANNELS, EMG_FEATURES, FeatureExtractor
+from model_bundle import save_bundle
 
 # ---------------------------------------------------
 # CONFIG
 # ---------------------------------------------------
-data_folder = "min_data"
 fs = 1000
-gesture_names = ["relax", "rock", "paper", "scissors"]
-list_examples = glob.glob(f"{data_folder}/*.h5")
-
-signal_dict = {}
-for example in list_examples:
-    base = os.path.basename(example)
-    example_class = base.split("_")[-1].split(".")[0]
-    example_trial = "1"
-
-    if example_class not in signal_dict:
-        signal_dict[example_class] = {}
-
-    data = bsnb.load(example)
-    signal_dict[example_class][example_trial] = {
-        "CH2": data["CH2"],  # finger flexor
-        "CH4": data["CH4"],  # finger extensor
-    }
-
-print("Loaded:", signal_dict.keys())
+gesture_names = GESTURES  # label order of the store: relax, rock, paper, scissors
+# The min_data/ recordings (subject = file name prefix, see dataset_store.parse_name);
+# add new subjects here and rebuild the store (python dataset_store.py)
+subjects = ["hayato", "one_min", "oneandahalf_min"]
 
 # ---------------------------------------------------
 # FEATURE EXTRACTION WITH WINDOWING (no accelerometer)
 # ---------------------------------------------------
-from scipy.signal import welch
-from scipy.stats import entropy
-import numpy as np
-from copy import deepcopy
-
 window_size = int(0.5 * fs)  # 0.5 s → 500 samples
 step = int(0.25 * fs)  # 50% overlap
 
-
-def spectral(sig):
-    f, Pxx = welch(sig, fs=fs)
-    if np.sum(Pxx) == 0:
-        return 0, 0
-    Pxx /= np.sum(Pxx)
-    return np.sum(f * Pxx), entropy(Pxx)
-
-
-features_dict = deepcopy(signal_dict)
-
-for class_i in signal_dict.keys():
-    for trial in signal_dict[class_i].keys():
-        features_dict[class_i][trial] = []  # list of feature vectors
-
-        ch_flex = signal_dict[class_i][trial]["CH2"]
-        ch_ext = signal_dict[class_i][trial]["CH4"]
-
-        # Slide over signal in 0.5s windows
-        for start in range(0, len(ch_flex) - window_size, step):
-            seg_flex = ch_flex[start : start + window_size]
-            seg_ext = ch_ext[start : start + window_size]
-            
-            features = extract_emg_features(np.column_stack([seg_flex, seg_ext]), fs=fs)
-            
-            features_dict[class_i][trial].append(features)
-
-print("Feature extraction complete (windowed).")
-
-# ---------------------------------------------------
-# BUILD DATASET ARRAYS (flatten windowed features)
-# ---------------------------------------------------
-X, y = [], []
-for g_idx, g in enumerate(gesture_names):
-    if g not in features_dict:
-        continue
-    for trial in features_dict[g]:
-        # Each trial is a list of window feature vectors
-        for feats in features_dict[g][trial]:
-            X.append(feats)
-            y.append(g_idx)
-
-X, y = np.array(X), np.array(y)
+# Same 17 features as feature_utils.extract_emg_features() per window
+extractor = FeatureExtractor(EMG_FEATURES, EMG_CHANNELS, fs)
+channels = {
+    "flexor": "CH2",  # finger flexor
+    "extensor": "CH4",  # finger extensor
+}
+
+if not os.path.exists(os.path.join(STORE_DIR, "index.npy")):
+    build_store()
+store = DatasetStore()
+rows = store.select(subject=subjects, label=list(range(len(gesture_names))), fs=fs)
+print("Loaded:", ", ".join(os.path.basename(path) for path in rows["path"]))
+
+# Slide over every recording in 0.5s windows, straight from the memory-mapped store
+X, y, _ = store.features(extractor, rows, channels, window_size, step)
 print("Dataset shape:", X.shape)
 
 # ---------------------------------------------------
@@ -124,3 +73,13 @@ os.makedirs("model_2", exist_ok=True)
 joblib.dump(mlp, "model_2/nn_classifier.pkl")
 # np.save("model_2/max_per_feature.npy", max_per_feature)
 print("✅ Model saved to model_2/nn_classifier.pkl")
+# Model + scaler + feature spec for life_classification_2.py
+save_bundle(
+    "model_2/emg_mlp.bundle",
+    mlp,
+    extractor,
+    gesture_names,
+    window=window_size,
+    step=step,
+    scaler=scaler,
+)
@@ -0,0 +1,310 @@
+"""
+Shared acquisition daemon.
+
+One process owns the BITalino and publishes every frame it reads into a
+shared-memory ring buffer. Any number of scripts attach to that buffer with
+SharedStreamClient (zero-copy NumPy views) or SharedBITalino (drop-in
+replacement for bitalino.BITalino).
+
+Run the daemon:
+    python shared_stream.py --mac 98:D3:11:FE:02:74
+
+Then start the consumers with BITALINO_SHARED=1 (see device_source.py).
+"""
+
+import argparse
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from ring_buffer import RingBuffer
+
+# ====== CONFIG ======
+STREAM_NAME = "bitalino_stream"
+MAC_ADDRESS = "98:D3:11:FE:02:74"
+FS = 1000
+CHANNELS = [0, 1, 2, 3, 4, 5]  # acquire everything, consumers pick their columns
+N_SAMPLES = 50
+HISTORY_SECS = 10
+N_META_COLS = 5  # nSeq, I1, I2, O1, O2
+# =====================
+
+# Header layout (int64 slots in front of the sample data)
+_MAGIC = 0x424954414C494E4F  # "BITALINO"
+(
+    _H_MAGIC,
+    _H_CAPACITY,
+    _H_NCOLS,
+    _H_FS,
+    _H_TOTAL,
+    _H_RUNNING,
+    _H_CHANNELS,
+    _H_DTYPE,
+) = range(8)
+_HEADER_SLOTS = 8
+_HEADER_BYTES = _HEADER_SLOTS * 8
+_DTYPE = np.int16
+
+
+def _channel_mask(channels):
+    mask = 0
+    for ch in channels:
+        mask |= 1 << ch
+    return mask
+
+
+def _mask_channels(mask):
+    return [ch for ch in range(6) if mask & (1 << ch)]
+
+
+class SharedRing(RingBuffer):
+    """
+    RingBuffer whose storage, sample counter and layout live in a
+    SharedMemory block. create() makes a new block; SharedRing(shm) attaches
+    to an existing one and reads capacity, columns and dtype from its header.
+    """
+
+    def __init__(self, shm, owner=False):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray((_HEADER_SLOTS,), dtype=np.int64, buffer=shm.buf)
+        if self.header[_H_MAGIC] != _MAGIC:
+            raise RuntimeError(f"Shared memory '{shm.name}' is not a BITalino stream")
+        capacity = int(self.header[_H_CAPACITY])
+        storage = np.ndarray(
+            (2 * capacity, int(self.header[_H_NCOLS])),
+            dtype=np.dtype(chr(self.header[_H_DTYPE])),
+            buffer=shm.buf,
+            offset=_HEADER_BYTES,
+        )
+        super().__init__(
+            capacity, storage=storage, counter=self.header[_H_TOTAL : _H_TOTAL + 1]
+        )
+
+    @classmethod
+    def create(cls, capacity, n_cols, dtype=_DTYPE, name=None, fs=0, channels=()):
+        """
+        A new, empty ring in shared memory, owned by this process (close()
+        unlinks it). name: None for a random one; fs / channels only
+        describe the stream to SharedStreamClient.
+        """
+        shm = shared_memory.SharedMemory(
+            name=name, create=True, size=cls.nbytes(capacity, n_cols, dtype)
+        )
+        header = np.ndarray((_HEADER_SLOTS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[_H_MAGIC] = _MAGIC
+        header[_H_CAPACITY] = capacity
+        header[_H_NCOLS] = n_cols
+        header[_H_FS] = fs
+        header[_H_CHANNELS] = _channel_mask(channels)
+        header[_H_DTYPE] = ord(np.dtype(dtype).char)
+        del header
+        return cls(shm, owner=True)
+
+    @staticmethod
+    def nbytes(capacity, n_cols, dtype=_DTYPE):
+        return _HEADER_BYTES + 2 * capacity * n_cols * np.dtype(dtype).itemsize
+
+    def close(self):
+        """Detach; the owner also unlinks the block."""
+        self.data = self._counter = self.header = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class SharedStreamServer:
+    """Owns the device and publishes each read into the shared ring."""
+
+    def __init__(
+        self,
+        device,
+        name=STREAM_NAME,
+        fs=FS,
+        channels=CHANNELS,
+        n_samples=N_SAMPLES,
+        history_secs=HISTORY_SECS,
+    ):
+        self.device = device
+        self.fs = fs
+        self.channels = sorted(set(channels))
+        self.n_samples = n_samples
+        capacity = int(fs * history_secs)
+        n_cols = N_META_COLS + len(self.channels)
+
+        self.ring = SharedRing.create(
+            capacity, n_cols, name=name, fs=fs, channels=self.channels
+        )
+        self.shm = self.ring.shm
+        self._running = False
+
+    def run(self):
+        """Read from the device until stop() or Ctrl+C."""
+        self.device.start(self.fs, self.channels)
+        self.ring.header[_H_RUNNING] = 1
+        self._running = True
+        print(
+            f"✅ Publishing channels {self.channels} @ {self.fs} Hz "
+            f"to shared memory '{self.shm.name}'"
+        )
+        try:
+            while self._running:
+                samples = self.device.read(self.n_samples)
+                self.ring.extend(samples)
+        except KeyboardInterrupt:
+            print("Interrupted by user.")
+        finally:
+            self.close()
+
+    def stop(self):
+        self._running = False
+
+    def close(self):
+        self.ring.header[_H_RUNNING] = 0
+        try:
+            self.device.stop()
+            self.device.close()
+            print("BITalino connection closed.")
+        except Exception as e:
+            print("⚠️ Error closing BITalino:", e)
+        self.ring.close()
+        self.ring = None
+
+
+class SharedStreamClient:
+    """Read-only attachment to a running SharedStreamServer."""
+
+    def __init__(self, name=STREAM_NAME, timeout=5.0):
+        deadline = time.time() + timeout
+        while True:
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+                break
+            except FileNotFoundError:
+                if time.time() > deadline:
+                    raise RuntimeError(
+                        f"No shared stream '{name}' found - is shared_stream.py running?"
+                    )
+                time.sleep(0.1)
+        # Attaching must not make this process unlink the block on exit
+        resource_tracker.unregister(shm._name, "shared_memory")
+        self.shm = shm
+        self.ring = SharedRing(shm)
+        self.fs = int(self.ring.header[_H_FS])
+        self.channels = _mask_channels(int(self.ring.header[_H_CHANNELS]))
+        self.capacity = self.ring.capacity
+
+    @property
+    def total(self) -> int:
+        """Number of frames published since the daemon started."""
+        return self.ring.total
+
+    @property
+    def running(self) -> bool:
+        return bool(self.ring.header[_H_RUNNING])
+
+    def latest(self, n, end=None):
+        """Zero-copy view of the last n frames (all columns).
+
+        The view stays valid until the daemon writes another capacity - n
+        frames; copy it if you need to keep it longer.
+        """
+        return self.ring.latest(n, end)
+
+    def analog(self, n, end=None):
+        """Zero-copy view of the analog columns of the last n frames."""
+        return self.latest(n, end)[:, N_META_COLS:]
+
+    def column(self, channel):
+        """Column index of an analog channel inside a frame."""
+        return N_META_COLS + self.channels.index(channel)
+
+    def close(self):
+        self.ring.close()
+        self.ring = None
+
+
+class SharedBITalino:
+    """Drop-in stand-in for bitalino.BITalino backed by the shared stream."""
+
+    def __init__(self, name=STREAM_NAME, timeout=5.0):
+        self.client = SharedStreamClient(name, timeout)
+        self.cursor = None
+        self.columns = None
+        self.overruns = 0
+
+    def start(self, SamplingRate=1000, analogChannels=[0, 1, 2, 3, 4, 5]):
+        if int(SamplingRate) != self.client.fs:
+            raise ValueError(
+                f"Shared stream runs at {self.client.fs} Hz, {SamplingRate} Hz requested"
+            )
+        channels = sorted(set(analogChannels))
+        missing = [ch for ch in channels if ch not in self.client.channels]
+        if missing:
+            raise ValueError(f"Channels {missing} are not published by the daemon")
+        self.columns = list(range(N_META_COLS)) + [
+            self.client.column(ch) for ch in channels
+        ]
+        self.cursor = self.client.total
+
+    def read(self, nSamples=100):
+        """Block until nSamples new frames are available, like BITalino.read."""
+        if self.cursor is None:
+            raise RuntimeError("Device not in acquisition - call start() first")
+        end = self.cursor + nSamples
+        while self.client.total < end:
+            if not self.client.running:
+                raise RuntimeError("Shared stream daemon stopped")
+            time.sleep(0.001)
+        if self.client.total - end > self.client.capacity - nSamples:
+            # We fell behind by more than the ring holds; resync on the newest data
+            self.overruns += 1
+            end = self.client.total
+        self.cursor = end
+        return self.client.latest(nSamples, end)[:, self.columns].astype(int)
+
+    def battery(self, value=0):
+        pass
+
+    def version(self):
+        return "shared stream"
+
+    def stop(self):
+        self.cursor = None
+
+    def close(self):
+        self.client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mac", default=MAC_ADDRESS)
+    parser.add_argument("--name", default=STREAM_NAME)
+    parser.add_argument("--fs", type=int, default=FS)
+    parser.add_argument("--channels", type=int, nargs="+", default=CHANNELS)
+    parser.add_argument("--n-samples", type=int, default=N_SAMPLES)
+    parser.add_argument("--history", type=float, default=HISTORY_SECS)
+    parser.add_argument("--replay", help="publish recordings instead of a device")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed, 0 = max")
+    args = parser.parse_args()
+
+    if args.replay:
+        from replay_device import ReplayBITalino
+
+        device = ReplayBITalino(args.replay, speed=args.speed)
+    else:
+        from bitalino import BITalino
+
+        print(f"Connecting to BITalino device {args.mac} ...")
+        device = BITalino(args.mac)
+    server = SharedStreamServer(
+        device,
+        name=args.name,
+        fs=args.fs,
+        channels=args.channels,
+        n_samples=args.n_samples,
+        history_secs=args.history,
+    )
+    server.run()